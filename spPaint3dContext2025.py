@@ -21,23 +21,63 @@ from __future__ import with_statement
 ###################################################
 
 import maya.cmds as mc
+import maya.mel as mm
 
-import maya.OpenMaya as om
-import maya.OpenMayaUI as omui
+#python API 2.0: out values are returned as tuples, no MScriptUtil pointers and lower per call overhead
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaUI as omui
 import math as math
 import sys
+import array
+
+try:
+    import numpy as np
+    import spPaint3dBVH2025 as sp3dBVH
+except ImportError:
+    #numpy isn't shipped with this maya install, only the maya raycast backend is available
+    np = None
+    sp3dBVH = None
 
 spPaint3dContextID = "spPaint3dContext2025"
 spPaint3dTempGroupID = "spPaint3dTempGroup2025"
+spPaint3dInstancerID = "spPaint3dInstancer2025"
+spPaint3dProxyCursorID = "spPaint3dProxyCursor2025"
 
-#unit conversion dictionnary relative to 1 cm (default unit system)
+#unit conversion dictionnary relative to 1 cm (default unit system), exact factors (1in = 2.54cm)
 sp3dUnit = {
-                    "mm": 10,
-                    "cm": 1,
+                    "mm": 10.0,
+                    "cm": 1.0,
                     "m": 0.01,
-                    "in": 0.393701,
-                    "ft": 0.0328084,
-                    "yd": 0.0109361,}
+                    "km": 0.00001,
+                    "in": 1.0/2.54,
+                    "ft": 1.0/30.48,
+                    "yd": 1.0/91.44,
+                    "mi": 1.0/160934.4,}
+
+#mesh attributes which invalidate the cached target data when dirtied
+sp3dGeometryAttrs = ('inMesh', 'outMesh', 'pnts')
+
+#number of face rings grown around the previous hit before falling back to the full target query (stroke-local raycast, see strokeLocality)
+sp3dLocalRings = 3
+
+#deferred creation (see placementQueue): number of queued placements and max delay in seconds before the objects get created
+sp3dFlushSize = 16
+sp3dFlushDelay = 0.25
+
+#real-time rampFX (see rampEngine): min ramp ratio change re-applied to an object and min delay in seconds between two applications while dragging
+sp3dRampTolerance = 0.02
+sp3dRampInterval = 0.1
+
+#paint distance resampling (see strokePath): relative distance to a drag sample hit under which a placement reuses that hit
+sp3dPathTolerance = 1e-6
+
+#viewport redraws per second while dragging (see refreshScheduler), 0 to redraw on every event
+sp3dRefreshRate = 30
+
+#place mode cursor pool (see cursorPool): number of sources kept warm and default hidden candidates per source (setup option), 0 to disable the pool
+#off by default: a cursor taken from the pool was created outside of the undo queue, undo doesn't delete it
+sp3dCursorPoolSize = 8
+sp3dCursorPoolDepth = 0
 
 sp3d_dbgfile = "C:\\sp3ddbg_log.txt"
 sp3d_dbg = False #debug flag to log to file
@@ -88,7 +128,7 @@ class intersectionPoint (object):
     '''
     define an intersection point
     '''
-    def __init__(self, hitPoint, hitFace, hitTriangle, dagMesh):
+    def __init__(self, hitPoint, hitFace, hitTriangle, dagMesh, fnMesh=None, target=None, hitBary=None):
         '''
         initial setup
         '''
@@ -96,43 +136,57 @@ class intersectionPoint (object):
         self.hitPoint = hitPoint     #point.position tuple
         self.hitFace = hitFace         #face number of the intersection
         self.hitTriangle = hitTriangle    #triangle number in the above face
+        self.hitBary = hitBary      #(w0, w1, w2) barycentric weights of the hit in the above triangle corners, None if unknown
         self.dagMeshTargetSurface = dagMesh        #MDagPath where the intersection occured (used to avoid having to compute all normals on soon-to-be discarded intersections
+        self.fnMeshTargetSurface = fnMesh       #cached MFnMesh of the above MDagPath if available (see targetCacheEntry)
+        self.targetCacheEntry = target      #targetCacheEntry of the above MDagPath if available, holds the cached triangle normals
         self.timestamp = None     #used to track the creation of an object at that intersectionPoint (later used in the strokePointList class)
         self.dagMeshSourceObject = None     #used to store the DAG path of the created geometry if it's actually a valid intersection
         self.generatedDAG = None    #used to store the DAG path of the created object
         self.initialScale = [1,1,1] #used to store the self.generatedDAG initial scale
+        self.placement = None       #(position, rotation, scale) tuple of the created placement (see paintContext.getPlacementTransform)
+        self.rotateOrder = om.MEulerRotation.kXYZ   #rotate order of the placement rotation, the one of the created object (the instancer uses XYZ)
+        self.particleId = None      #id of the particle holding the placement in the point instancer
+        self.hitNormal = None       #normal (MVector) used to align the created object, None if not aligned
 
     def getHitNormal(self, smooth=False):
         '''
         return the normal (MVector) at the self.hitPoint, compute the normal differently according to the smooth boolean argument
         '''
         if (smooth):
+            #interpolating the cached corner normals of the hit triangle when the barycentric weights of the hit are known
+            if (self.targetCacheEntry and self.hitBary):
+                normal = self.targetCacheEntry.getSmoothNormal(self.hitFace, self.hitTriangle, self.hitBary)
+                if (normal): return normal
+
             #getting the intersection normal from the MFnMesh method
-            normal = om.MVector()
-            fnMesh = om.MFnMesh( self.dagMeshTargetSurface )
-            fnMesh.getClosestNormal(self.hitPoint.asMPoint(), normal, om.MSpace.kWorld, None)
+            fnMesh = self.fnMeshTargetSurface or om.MFnMesh( self.dagMeshTargetSurface )
+            normal, closestFace = fnMesh.getClosestNormal(self.hitPoint.asMPoint(), om.MSpace.kWorld)
 
             return normal
         else:
-            #compute hard normal (decal mode)
-            hitFacept =om.MScriptUtil()
-            om.MScriptUtil().setInt(hitFacept.asIntPtr(),self.hitFace)
+            #hard normal (decal mode), looked up in the target cached triangle normals when possible
+            if (self.targetCacheEntry):
+                normal = self.targetCacheEntry.getTriangleNormal(self.hitFace, self.hitTriangle)
+                if (normal): return normal
+
+            #compute hard normal
             itMesh = om.MItMeshPolygon(self.dagMeshTargetSurface)
-            itMesh.setIndex(self.hitFace, hitFacept.asIntPtr())
-            triVertsArray = om.MPointArray()
-            triIndexArray = om.MIntArray()
-            itMesh.getTriangle(self.hitTriangle, triVertsArray, triIndexArray, om.MSpace.kWorld)
+            itMesh.setIndex(self.hitFace)
+            triVertsArray, triIndexArray = itMesh.getTriangle(self.hitTriangle, om.MSpace.kWorld)
 
             return self.getCrossProduct(triVertsArray[0],triVertsArray[1],triVertsArray[2])
 
-    def convertUnit(self, currentUnit):
+    def convertUnit(self, currentUnit, unitFactor=None):
         '''
         will convert the stored intersection internal coordinates into the current unit of the scene
+        unitFactor is the cm to currentUnit factor when already resolved (see strokeView.unitFactor)
         '''
-        if(currentUnit!='cm'):
-            self.hitPoint.x = float(mc.convertUnit(self.hitPoint.x, fromUnit='cm', toUnit=currentUnit))
-            self.hitPoint.y = float(mc.convertUnit(self.hitPoint.y, fromUnit='cm', toUnit=currentUnit))
-            self.hitPoint.z = float(mc.convertUnit(self.hitPoint.z, fromUnit='cm', toUnit=currentUnit))
+        if (unitFactor is None): unitFactor = getUnitFactor(currentUnit)
+        if (unitFactor != 1.0):
+            self.hitPoint.x *= unitFactor
+            self.hitPoint.y *= unitFactor
+            self.hitPoint.z *= unitFactor
 
     def getCrossProduct(self, p1, p2, p3):
         '''
@@ -187,68 +241,1297 @@ class intersectionPoint (object):
 
 
 
-class intersectionList (object):
+class strokeBuffer (object):
     '''
-    define list of intersection points
+    placements of a paint stroke stored in typed arrays (struct of arrays) rather than a list of intersectionPoint objects
+    vector data is flattened: items 3*index to 3*index+2 of the array belong to the placement index
     '''
-    def __init__(self, ipoint=None):
+    __slots__ = ('positions', 'normals', 'faces', 'triangles', 'sourceIndices', 'sources', 'initialScales', 'rotations', 'rotateOrders', 'particleIds', 'generatedDAGs', 'timestamp')
+
+    def __init__(self):
         '''
         initial setup
-        input: point object, (optional point object)
         '''
-        self.intersectionList = []
-        if (ipoint): self.addPoint(ipoint)
-        if(sp3d_log): print ("creating a new intersectionList (empty? %s)" % self.intersectionList)
+        self.positions = array.array('d')       #x,y,z of the placements hit points
+        self.normals = array.array('d')         #x,y,z of the normals used to align the created objects (0,0,0 if not aligned)
+        self.faces = array.array('l')           #face number of the hits
+        self.triangles = array.array('l')       #triangle number of the hits in the above faces
+        self.sourceIndices = array.array('l')   #index of the placement source object in self.sources
+        self.sources = []                       #source objects DAG strings used by the stroke
+        self.initialScales = array.array('d')   #x,y,z scale of the created objects right after their creation
+        self.rotations = array.array('d')       #x,y,z rotation (degrees) of the placements right after their creation, base of the rampFX rotation
+        self.rotateOrders = array.array('l')    #MEulerRotation order of the above rotations
+        self.particleIds = array.array('l')     #particle id of the placements sent to the point instancer, -1 otherwise
+        self.generatedDAGs = []                 #DAG string of the created objects, None until created (and in instancer output mode)
+        self.timestamp = None                   #timerX of the last placement (timer based paint flux)
+
+    def addPoint(self, ipoint):
+        '''
+        append the ipoint intersectionPoint placement, return its index
+        '''
+        index = len(self.generatedDAGs)
+        self.positions.extend((ipoint.hitPoint.x, ipoint.hitPoint.y, ipoint.hitPoint.z))
+        self.normals.extend((0.0, 0.0, 0.0))
+        self.faces.append(ipoint.hitFace)
+        self.triangles.append(ipoint.hitTriangle)
+        if (ipoint.dagMeshSourceObject not in self.sources): self.sources.append(ipoint.dagMeshSourceObject)
+        self.sourceIndices.append(self.sources.index(ipoint.dagMeshSourceObject))
+        self.initialScales.extend((1.0, 1.0, 1.0))
+        self.rotations.extend((0.0, 0.0, 0.0))
+        self.rotateOrders.append(om.MEulerRotation.kXYZ)
+        self.particleIds.append(-1)
+        self.generatedDAGs.append(None)
+        if (ipoint.timestamp is not None): self.timestamp = ipoint.timestamp
+        if(sp3d_log): print ("adding a new placement to strokeBuffer (length of buffer: %i)" % len(self.generatedDAGs))
+        return index
+
+    def setCreated(self, index, ipoint):
+        '''
+        store the result of the ipoint placement creation (created object, initial scale, normal, point instancer particle)
+        '''
+        self.generatedDAGs[index] = ipoint.generatedDAG
+        self.initialScales[3*index:3*index+3] = array.array('d', ipoint.initialScale)
+        if (ipoint.hitNormal): self.normals[3*index:3*index+3] = array.array('d', (ipoint.hitNormal.x, ipoint.hitNormal.y, ipoint.hitNormal.z))
+        if (ipoint.placement): self.rotations[3*index:3*index+3] = array.array('d', ipoint.placement[1])
+        self.rotateOrders[index] = ipoint.rotateOrder
+        if (ipoint.particleId is not None): self.particleIds[index] = ipoint.particleId
+
+    def getLength(self):
+        '''
+        return the number of placements in the buffer
+        '''
+        return len(self.generatedDAGs)
+
+    def getPosition(self, index):
+        '''
+        return the hit point (point object) of the placement index, negative indices count from the end
+        '''
+        if (index < 0): index += len(self.generatedDAGs)
+        return point(*self.positions[3*index:3*index+3])
+
+    def getSource(self, index):
+        '''
+        return the source object DAG string of the placement index
+        '''
+        return self.sources[self.sourceIndices[index]]
+
+    def printList(self):
+        '''
+        debug: print the dag of all objects in the buffer
+        '''
+        for index, generatedDAG in enumerate(self.generatedDAGs):
+            print ("object created: %s (using source: %s)" % (generatedDAG, self.getSource(index)))
+
+
+
+class intersectionBatch (object):
+    '''
+    result of a batched ray query (see targetSurfaceBatchIntersect), one entry per ray in each list
+    '''
+    def __init__(self, count, targetKeys):
+        '''
+        initial setup, every ray starts without hit
+        '''
+        self.count = count                      #number of rays in the batch
+        self.targetKeys = targetKeys            #targetList keys in query order, indexed by self.targets
+        self.points = [None] * count            #point object of the hit, None if no hit
+        self.normals = [None] * count           #hard (triangle) normal as an (x, y, z) tuple, None if no hit
+        self.faces = [-1] * count               #face number of the hit
+        self.triangles = [-1] * count           #triangle number in the above face
+        self.barycentrics = [None] * count      #(w0, w1, w2) barycentric weights of the hit in the triangle corners
+        self.targets = [-1] * count             #index in self.targetKeys of the target hit, -1 if no hit
+        self.distances = [float('inf')] * count #distance from the ray origin
+
+    def isHit(self, index):
+        '''
+        return True if ray <index> hit a target
+        '''
+        return self.targets[index] >= 0
+
+    def getHitCount(self):
+        '''
+        return the number of rays which hit a target
+        '''
+        return sum(1 for target in self.targets if target >= 0)
+
+    def convertUnit(self, unitFactor):
+        '''
+        convert the hit points from the internal cm to the unit of the unitFactor (see getUnitFactor)
+        '''
+        convertPositions([hitPoint for hitPoint in self.points if hitPoint], unitFactor)
+
+    def getIntersectionPoint(self, index):
+        '''
+        return the intersectionPoint object of ray <index>, same as targetSurfaceLoopIntersect would return for that ray
+        return None if the ray didn't hit anything
+        '''
+        if (not self.isHit(index)): return None
+        target = sp3dTargetCache.entries.get(self.targetKeys[self.targets[index]])
+        if (not target): return None
+        hitPoint = self.points[index]
+        return intersectionPoint(point(hitPoint.x, hitPoint.y, hitPoint.z), self.faces[index], self.triangles[index], target.dagPath, target.fnMesh, target, self.barycentrics[index])
+
+
+
+class rayHitBuffer (object):
+    '''
+    result of the last positive closestIntersection test, reused by every test of a ray query
+    '''
+    def __init__(self):
+        '''
+        initial setup
+        '''
+        self.hitPoint = None    #MFloatPoint of the last positive test
+        self.hitParam = 0.0     #ray parameter of the intersection (negative when behind the ray source)
+        self.hitFace = -1       #face number of the intersection
+        self.hitTri = -1        #triangle number in the above face
+        self.hitBary1 = 0.0     #barycentric weight of the hit triangle first vertex
+        self.hitBary2 = 0.0     #barycentric weight of the hit triangle second vertex
+
+    def intersect(self, target, raySource, rayDir, maxParam, faceIds=None):
+        '''
+        closest intersection of the ray (MFloatPoint, MFloatVector) with the target (targetCacheEntry) within maxParam, both directions tested
+        optional faceIds (MIntArray) to only test these faces, the acceleration grid of the whole mesh isn't used then
+        return True if there was an intersection, the result is then stored in self
+        '''
+        hitPoint, hitParam, hitFace, hitTri, hitBary1, hitBary2 = target.fnMesh.closestIntersection( raySource,
+                                rayDir,
+                                om.MSpace.kWorld,
+                                maxParam,
+                                True,
+                                faceIds,
+                                None,
+                                False,
+                                None if faceIds else target.accelParams)
+        if (hitFace < 0): return False
+        self.hitPoint = hitPoint
+        self.hitParam = hitParam
+        self.hitFace = hitFace
+        self.hitTri = hitTri
+        self.hitBary1 = hitBary1
+        self.hitBary2 = hitBary2
+        return True
+
+    def getParam(self):
+        '''
+        return the absolute ray parameter of the last intersection
+        '''
+        return abs(self.hitParam)
+
+    def getFace(self):
+        '''
+        return the face number of the last intersection
+        '''
+        return self.hitFace
+
+    def getTriangle(self):
+        '''
+        return the triangle number (in its face) of the last intersection
+        '''
+        return self.hitTri
+
+    def getBarycentrics(self):
+        '''
+        return the (w0, w1, w2) barycentric weights of the last intersection in its triangle corners
+        '''
+        return (self.hitBary1, self.hitBary2, 1.0 - self.hitBary1 - self.hitBary2)
+
+    def getClosest(self, distance, key, target):
+        '''
+        return the (distance, key, targetCacheEntry, hit point, face, triangle, barycentrics) tuple of the last intersection, as returned by getClosestTargetHit
+        '''
+        return (distance, key, target, point(self.hitPoint.x, self.hitPoint.y, self.hitPoint.z), self.hitFace, self.hitTri, self.getBarycentrics())
+
+
+
+class targetCacheEntry (object):
+    '''
+    cached API handles and ray acceleration data of a single registered target surface
+    '''
+    def __init__(self, targetdag):
+        '''
+        initial setup, the acceleration structure itself is built by self.build()
+        '''
+        self.registeredDAG = targetdag  #dag string of the target shape as stored in the sp3dObjectList.obj data
+        self.targetDAG = targetdag      #current full dag path string of the shape, follows renames and reparenting
+        self.nodeHandle = om.MObjectHandle(getDAGObject(targetdag).node())  #survives renames and reparenting, tracks deletion
+        self.dagPath = None             #cached MDagPath of the shape, resolved by self.resolve()
+        self.fnMesh = None              #cached MFnMesh attached to self.dagPath
+        self.accelParams = None         #MMeshIsectAccelParams passed to closestIntersection so Maya reuses its cached grid
+        self.dirty = True               #True until built, and again whenever the mesh topology or points are modified
+        self.worldDirty = True          #True whenever the world space triangles changed (geometry edit or transform), used by the bvh backend
+        self.handleDirty = True         #True when the cached handles have to be resolved again (rename, reparenting)
+        self.boxMin = None              #(x, y, z) tuple, world bounding box min corner of the shape, see self.getBox()
+        self.boxMax = None              #(x, y, z) tuple, world bounding box max corner of the shape
+        self.boxDirty = True            #True whenever the world bounding box has to be computed again
+        self.triNormals = None          #(n,3) numpy array of the world space normal of every triangle, see self.getTriangleNormal()
+        self.triCornerNormals = None    #(n,3,3) numpy array of the world space smooth normal at the 3 corners of every triangle, see self.getSmoothNormal()
+        self.triOffsets = None          #numpy array, index in the above arrays of the first triangle of every face
+        self.normalsDirty = True        #True whenever the triangle normals have to be computed again (geometry edit or transform)
+        self.cache = None               #targetCache owning the entry, its box index is flagged when the box changes
+        self.valid = True               #False once the target node has been deleted
+        self.nodeCallbackIDs = []       #node dirty, name changed and removal callbacks bound to the shape node
+        self.pathCallbackIDs = []       #world matrix, reparenting and ancestors name changed callbacks bound to the current dag path
+
+        node = self.nodeHandle.object()
+        self.nodeCallbackIDs.append(om.MNodeMessage.addNodeDirtyPlugCallback(node, self.onNodeDirty))
+        self.nodeCallbackIDs.append(om.MNodeMessage.addNameChangedCallback(node, self.onNameChanged))
+        self.nodeCallbackIDs.append(om.MNodeMessage.addNodePreRemovalCallback(node, self.onRemoval))
+        self.resolve()
+
+    def resolve(self):
+        '''
+        resolve the cached MDagPath & MFnMesh from the node handle and bind the path based callbacks to them
+        '''
+        removeCallbacks(self.pathCallbackIDs)
+        self.dagPath = om.MDagPath.getAPathTo(self.nodeHandle.object())
+        self.fnMesh = om.MFnMesh(self.dagPath)
+        self.targetDAG = self.dagPath.fullPathName()
+
+        self.pathCallbackIDs.append(om.MDagMessage.addWorldMatrixModifiedCallback(self.dagPath, self.onWorldMatrixModified))
+        self.pathCallbackIDs.append(om.MDagMessage.addParentAddedDagPathCallback(self.dagPath, self.onReparent))
+        self.pathCallbackIDs.append(om.MDagMessage.addParentRemovedDagPathCallback(self.dagPath, self.onReparent))
+        #a rename of any transform above the shape changes its full path too
+        ancestor = om.MDagPath(self.dagPath)
+        ancestor.pop()
+        while (ancestor.length() > 0):
+            self.pathCallbackIDs.append(om.MNodeMessage.addNameChangedCallback(ancestor.node(), self.onNameChanged))
+            ancestor.pop()
+        self.handleDirty = False
+
+    def build(self):
+        '''
+        (re)build the acceleration grid of the target mesh
+        '''
+        if (self.accelParams): self.fnMesh.freeCachedIntersectionAccelerator()
+        self.accelParams = self.fnMesh.autoUniformGridParams()
+
+        #casting a throw-away ray so the grid is computed now rather than on the first drag event
+        self.fnMesh.closestIntersection(om.MFloatPoint(), om.MFloatVector(0,1,0), om.MSpace.kObject, 1.0, False, None, None, False, self.accelParams)
+        self.dirty = False
+        if (sp3d_MFn): print ("accelerator built for %s: %s" % (self.targetDAG, self.fnMesh.cachedIntersectionAcceleratorInfo()))
+
+    def getBox(self):
+        '''
+        return the world bounding box of the shape as (min, max) tuples, computed again only when the shape was edited or moved
+        '''
+        if (self.boxDirty):
+            box = om.MFnDagNode(self.dagPath).boundingBox
+            box.transformUsing(self.dagPath.inclusiveMatrix())
+            boxMin = box.min
+            boxMax = box.max
+            self.boxMin = (boxMin.x, boxMin.y, boxMin.z)
+            self.boxMax = (boxMax.x, boxMax.y, boxMax.z)
+            self.boxDirty = False
+        return self.boxMin, self.boxMax
+
+    def buildNormals(self):
+        '''
+        compute the world space triangle normals and triangle corner normals of the whole mesh into numpy arrays
+        '''
+        points, triangleVertices, triangleFaces, triangleIndices = getMeshTriangles(self.fnMesh)
+        tris = points[triangleVertices]
+        normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+        lengths = np.linalg.norm(normals, axis=1)
+        self.triNormals = normals / np.where(lengths > 0.0, lengths, 1.0)[:, None]
+
+        #corner normals: triangle corner -> face vertex (getTriangleOffsets, already mesh wide offsets) -> normal id (getNormalIds) -> normal
+        meshNormals = np.array([(n.x, n.y, n.z) for n in self.fnMesh.getNormals(om.MSpace.kWorld)]).reshape(-1, 3)
+        normalCounts, normalIds = self.fnMesh.getNormalIds()
+        triangleCounts, triangleCorners = self.fnMesh.getTriangleOffsets()
+        triangleCounts = np.array(list(triangleCounts), dtype=np.int64)
+        self.triCornerNormals = sp3dBVH.getCornerNormals(meshNormals, list(normalIds), list(triangleCorners))
+
+        self.triOffsets = np.cumsum(triangleCounts) - triangleCounts
+        self.normalsDirty = False
+
+    def getTriangleNormal(self, face, triangle):
+        '''
+        return the world space normal (MVector) of the triangle number <triangle> of <face>, from the cached normal arrays
+        the arrays are computed for the whole mesh on first use and again only after a geometry edit or a transform change
+        return None if numpy isn't available
+        '''
+        if (np is None): return None
+        if (self.normalsDirty or self.triNormals is None): self.buildNormals()
+        normal = self.triNormals[self.triOffsets[face] + triangle]
+        return om.MVector(normal[0], normal[1], normal[2])
+
+    def getSmoothNormal(self, face, triangle, barycentrics):
+        '''
+        return the world space smooth normal (MVector) at the (w0, w1, w2) barycentric weights of the triangle number <triangle> of <face>
+        interpolated from the cached corner normals, so no closest point search is needed
+        return None if numpy isn't available
+        '''
+        if (np is None): return None
+        if (self.normalsDirty or self.triCornerNormals is None): self.buildNormals()
+        corners = self.triCornerNormals[self.triOffsets[face] + triangle]
+        blended = barycentrics[0] * corners[0] + barycentrics[1] * corners[1] + barycentrics[2] * corners[2]
+        normal = om.MVector(float(blended[0]), float(blended[1]), float(blended[2]))
+        normal.normalize()
+        return normal
+
+    def setBoxDirty(self):
+        '''
+        flag the world bounding box (and the box index of the owning cache) for an update
+        '''
+        self.boxDirty = True
+        if (self.cache): self.cache.indexDirty = True
+
+    def refresh(self):
+        '''
+        bring the cached handles and acceleration grid up to date, return False if the target isn't usable anymore
+        '''
+        if (not self.isValid()): return False
+        if (self.handleDirty): self.resolve()
+        if (self.dirty): self.build()
+        return True
+
+    def isValid(self):
+        '''
+        return True as long as the target node hasn't been deleted
+        '''
+        return self.valid and self.nodeHandle.isValid()
+
+    def onNodeDirty(self, node, plug, *args):
+        '''
+        node dirty callback, flag the entry for a rebuild only when the geometry itself changed
+        '''
+        if (plug.isChild): plug = plug.parent()
+        if (om.MFnAttribute(plug.attribute()).name in sp3dGeometryAttrs):
+            self.dirty = True
+            self.worldDirty = True
+            self.normalsDirty = True
+            self.setBoxDirty()
+
+    def onWorldMatrixModified(self, transform, modified, *args):
+        '''
+        world matrix callback, the world space triangles of the bvh backend, the triangle normals and the world box have to be fetched again
+        '''
+        self.worldDirty = True
+        self.normalsDirty = True
+        self.setBoxDirty()
+
+    def onNameChanged(self, node, previousName, *args):
+        '''
+        name changed callback of the shape or one of its parents, the cached dag path string is outdated
+        '''
+        self.handleDirty = True
+
+    def onReparent(self, child, parent, *args):
+        '''
+        parent added/removed callback, the cached MDagPath doesn't point to the shape anymore
+        '''
+        self.handleDirty = True
+        self.worldDirty = True
+        self.normalsDirty = True
+        self.setBoxDirty()
+
+    def onRemoval(self, node, *args):
+        '''
+        node removal callback, the handles must not be used anymore
+        '''
+        self.valid = False
+        if (self.cache): self.cache.indexDirty = True
+
+    def release(self):
+        '''
+        remove the callbacks and free the cached acceleration grid
+        '''
+        removeCallbacks(self.nodeCallbackIDs)
+        removeCallbacks(self.pathCallbackIDs)
+        if (self.accelParams and self.isValid()):
+            self.fnMesh.freeCachedIntersectionAccelerator()
+        self.accelParams = None
+
+
+
+class targetCache (object):
+    '''
+    store a targetCacheEntry per target, keyed like the sp3dObjectList.obj dictionnary
+    '''
+    def __init__(self):
+        '''
+        initial setup
+        '''
+        self.entries = {}
+        self.bvh = None         #sp3dBVH.sceneBVH, one meshBVH per target under a top level over their bounds, only used by the bvh raycast backend
+        self.index = None       #spatial index over the target world boxes: sp3dBVH.boxBVH, or a (key, min, max) list without numpy
+        self.indexDirty = True  #True when a target was added, removed, edited or moved since self.index was built
+
+    def register(self, key, targetdag):
+        '''
+        create (or replace) the entry for key and build its acceleration structure
+        return None if targetdag doesn't exist in the scene
+        '''
+        self.release(key)
+        if (not targetdag or not mc.objExists(targetdag)): return None
+        entry = targetCacheEntry(targetdag)
+        entry.build()
+        entry.cache = self
+        self.entries[key] = entry
+        self.indexDirty = True
+        return entry
+
+    def release(self, key):
+        '''
+        drop the entry for key if any
+        '''
+        entry = self.entries.pop(key, None)
+        if (entry):
+            entry.release()
+            self.indexDirty = True
+
+    def clear(self):
+        '''
+        drop all the entries
+        '''
+        for key in list(self.entries.keys()):
+            self.release(key)
+        self.bvh = None
+        self.index = None
+
+    def get(self, key, targetdag):
+        '''
+        return an up to date entry for key, registering it first if the target wasn't known yet (or its shape changed or was deleted)
+        return None if the target can't be found in the scene
+        '''
+        entry = self.entries.get(key)
+        if (not entry or entry.registeredDAG != targetdag or not entry.refresh()):
+            return self.register(key, targetdag)
+        return entry
+
+    def prepare(self, targetList):
+        '''
+        make sure every target of targetList has a built acceleration structure, called at stroke start
+        '''
+        for obj, data in targetList.obj.items():
+            self.get(obj, data[0])
+
+    def getIndex(self):
+        '''
+        return the spatial index over the world boxes of the valid entries, rebuilt only when flagged dirty
+        '''
+        if (self.index is None or self.indexDirty):
+            keys = []
+            boxes = []
+            for key, entry in self.entries.items():
+                if (not entry.refresh()): continue
+                keys.append(key)
+                boxes.append(entry.getBox())
+            if (sp3dBVH):
+                self.index = sp3dBVH.boxBVH(keys, [box[0] for box in boxes], [box[1] for box in boxes])
+            else:
+                self.index = [(key, box[0], box[1]) for key, box in zip(keys, boxes)]
+            self.indexDirty = False
+            if (sp3d_MFn): print ("box index built over %i targets" % len(keys))
+        return self.index
+
+    def getCandidates(self, targetList, clickPos, clickDir, farclip):
+        '''
+        return the (box entry distance, key) list of the targetList targets whose world box is crossed by the ray within farclip, sorted near to far
+        both ray directions are considered, like the closestIntersection calls of rayHitBuffer.intersect
+        '''
+        index = self.getIndex()
+        if (sp3dBVH):
+            candidates = index.candidates((clickPos.x, clickPos.y, clickPos.z), (clickDir.x, clickDir.y, clickDir.z), farclip, True)
+        else:
+            candidates = []
+            for key, boxMin, boxMax in index:
+                distance = getRayBoxDistance(clickPos, clickDir, boxMin, boxMax)
+                if (distance is not None and distance <= farclip): candidates.append((distance, key))
+            candidates.sort(key=lambda candidate: candidate[0])
+        return [candidate for candidate in candidates if candidate[1] in targetList.obj]
+
+    def updateBVH(self, targetList):
+        '''
+        bring the sceneBVH up to date with targetList, called at stroke start by the bvh raycast backend
+        only the targets which are new, edited or moved get their meshBVH rebuilt, the others are kept as they are
+        '''
+        if (self.bvh is None): self.bvh = sp3dBVH.sceneBVH()
+        for obj in list(self.bvh.meshes.keys()):
+            if (obj not in targetList.obj): self.bvh.removeMesh(obj)
+        rebuilt = 0
+        for obj, data in targetList.obj.items():
+            entry = self.get(obj, data[0])
+            if (not entry):
+                self.bvh.removeMesh(obj)
+            elif (entry.worldDirty or obj not in self.bvh.meshes):
+                points, triangleVertices, triangleFaces, triangleIndices = getMeshTriangles(entry.fnMesh)
+                self.bvh.setMesh(obj, points, triangleVertices, triangleFaces, triangleIndices)
+                entry.worldDirty = False
+                rebuilt += 1
+        if (self.bvh.topDirty): self.bvh.buildTop()
+        if (sp3d_MFn and rebuilt): print ("bvh rebuilt for %i of %i targets (%i triangles)" % (rebuilt, len(self.bvh.meshKeys), self.bvh.getTriangleCount()))
+        return self.bvh
+
+    def getBVH(self, targetList):
+        '''
+        return the sceneBVH over the world space triangles of every target of targetList, as built by updateBVH at stroke start
+        return None if it isn't up to date (target added or removed, edited or moved since), never rebuilds it in the middle of a stroke
+        '''
+        if (self.bvh is None): return None
+        entries = [self.entries.get(obj) for obj in targetList.obj.keys()]
+        keys = set(obj for obj, entry in zip(targetList.obj.keys(), entries) if entry)
+        if (set(self.bvh.meshes.keys()) != keys or any(entry.worldDirty for entry in entries if entry)): return None
+        return self.bvh
+
+#module wide target cache, fed by sp3dObjectList.addObj and refreshed at stroke start
+sp3dTargetCache = targetCache()
+
+
+
+class sourcePrototype (object):
+    '''
+    metadata of a registered source object, queried once and reused by every placement until the source is edited
+    '''
+    def __init__(self, sourcedag, transformdag):
+        '''
+        initial setup, the metadata itself is queried by self.build()
+        '''
+        self.registeredDAG = sourcedag  #dag string of the source as stored in the sp3dObjectList.obj data (shape, or transform of a group)
+        self.transformDAG = transformdag  #full dag path string of the transform to duplicate/instance, see getCloneTarget
+        self.nodeHandle = om.MObjectHandle(getDAGObject(transformdag).node())  #survives renames and reparenting, tracks deletion
+        self.isGroup = False            #True when the transform has no shape of its own but transform children
+        self.pivotOffset = om.MVector() #translation to add to a position to bring the world scale pivot of the source on it, see moveTo
+        self.fixedPivot = True          #True when the local pivots are at the origin, the pivot offset of the duplicates doesn't change when they are rotated or scaled
+        self.scalePivot = [0.0, 0.0, 0.0]   #object space scale pivot of the source
+        self.rotatePivot = [0.0, 0.0, 0.0]  #object space rotate pivot of the source
+        self.rotateOrder = om.MEulerRotation.kXYZ   #rotateOrder attribute of the source, same values as the MEulerRotation orders
+        self.rotation = om.MEulerRotation()  #rotation of the source in its rotate order, inherited by its duplicates/instances
+        self.scale = [1.0, 1.0, 1.0]    #scale of the source, inherited by its duplicates/instances
+        self.boxMin = None              #(x, y, z) tuple, world bounding box min corner of the source hierarchy
+        self.boxMax = None              #(x, y, z) tuple, world bounding box max corner of the source hierarchy
+        self.localBoxMin = None         #(x, y, z) tuple, object space bounding box min corner of the source hierarchy, see createProxyCursor
+        self.localBoxMax = None         #(x, y, z) tuple, object space bounding box max corner of the source hierarchy
+        self.polyCount = 0              #number of faces of all the meshes of the source hierarchy
+        self.dirty = True               #True until built, and again whenever the source (or one of its shapes) is edited, moved or renamed
+        self.valid = True               #False once the source transform has been deleted
+        self.nodeCallbackIDs = []       #attribute changed, name changed and removal callbacks bound to the transform node
+        self.pathCallbackIDs = []       #world matrix callback of the transform and node dirty callbacks of its shapes, bound again by self.build()
+
+        node = self.nodeHandle.object()
+        self.nodeCallbackIDs.append(om.MNodeMessage.addAttributeChangedCallback(node, self.onAttributeChanged))
+        self.nodeCallbackIDs.append(om.MNodeMessage.addNameChangedCallback(node, self.onNameChanged))
+        self.nodeCallbackIDs.append(om.MNodeMessage.addNodePreRemovalCallback(node, self.onRemoval))
+
+    def build(self):
+        '''
+        query the source metadata and bind the path and shape callbacks
+        '''
+        removeCallbacks(self.pathCallbackIDs)
+        dagPath = om.MDagPath.getAPathTo(self.nodeHandle.object())
+        self.transformDAG = dagPath.fullPathName()
+
+        scalePivot = mc.xform(self.transformDAG, query=True, ws=True, sp=True)
+        transform = mc.xform(self.transformDAG, query=True, ws=True, t=True)
+        self.scalePivot = mc.xform(self.transformDAG, query=True, os=True, sp=True)
+        self.rotatePivot = mc.xform(self.transformDAG, query=True, os=True, rp=True)
+        rotation = mc.xform(self.transformDAG, query=True, ro=True)
+        self.pivotOffset = om.MVector(transform[0]-scalePivot[0], transform[1]-scalePivot[1], transform[2]-scalePivot[2])
+        self.fixedPivot = not any(self.scalePivot + self.rotatePivot)
+        self.rotateOrder = mc.getAttr(self.transformDAG + '.rotateOrder')
+        self.rotation = om.MEulerRotation(math.radians(rotation[0]), math.radians(rotation[1]), math.radians(rotation[2]), self.rotateOrder)
+        self.scale = mc.xform(self.transformDAG, query=True, scale=True, r=True)
+
+        shapes = mc.listRelatives(self.transformDAG, children=True, shapes=True, fullPath=True) or []
+        self.isGroup = not shapes and bool(mc.listRelatives(self.transformDAG, children=True, type='transform'))
+
+        box = mc.exactWorldBoundingBox(self.transformDAG)
+        self.boxMin = tuple(box[:3])
+        self.boxMax = tuple(box[3:])
+        box = mc.xform(self.transformDAG, query=True, os=True, boundingBox=True)
+        self.localBoxMin = tuple(box[:3])
+        self.localBoxMax = tuple(box[3:])
+        meshes = mc.listRelatives(self.transformDAG, allDescendents=True, type='mesh', noIntermediate=True, fullPath=True) or []
+        self.polyCount = sum([mc.polyEvaluate(mesh, face=True) for mesh in meshes])
+
+        #moving any parent moves the source too, editing any shape changes its box and poly count
+        self.pathCallbackIDs.append(om.MDagMessage.addWorldMatrixModifiedCallback(dagPath, self.onWorldMatrixModified))
+        for shape in mc.listRelatives(self.transformDAG, allDescendents=True, shapes=True, fullPath=True) or []:
+            self.pathCallbackIDs.append(om.MNodeMessage.addNodeDirtyPlugCallback(getDAGObject(shape).node(), self.onNodeDirty))
+        self.dirty = False
+        if (sp3d_log): print ("source prototype built for %s: %i faces" % (self.transformDAG, self.polyCount))
+
+    def refresh(self):
+        '''
+        bring the metadata up to date, return False if the source isn't usable anymore
+        '''
+        if (not self.isValid()): return False
+        if (self.dirty): self.build()
+        return True
+
+    def isValid(self):
+        '''
+        return True as long as the source transform hasn't been deleted
+        '''
+        return self.valid and self.nodeHandle.isValid()
+
+    def getTransform(self):
+        '''
+        return the (pivot offset (MVector), rotation (MEulerRotation in the source rotate order), scale (x,y,z)) of the source, as inherited by its duplicates/instances
+        '''
+        return self.pivotOffset, self.rotation, self.scale
+
+    def onAttributeChanged(self, message, plug, otherPlug, *args):
+        '''
+        attribute changed callback of the transform, only the values set on it matter (transform values, pivots...)
+        instancing the source changes its connections, which must not flag it
+        '''
+        if (message & om.MNodeMessage.kAttributeSet): self.dirty = True
+
+    def onWorldMatrixModified(self, transform, modified, *args):
+        '''
+        world matrix callback, the source or one of its parents moved
+        '''
+        self.dirty = True
+
+    def onNodeDirty(self, node, plug, *args):
+        '''
+        node dirty callback of the shapes, flag the metadata only when the geometry itself changed
+        '''
+        if (plug.isChild): plug = plug.parent()
+        if (om.MFnAttribute(plug.attribute()).name in sp3dGeometryAttrs): self.dirty = True
+
+    def onNameChanged(self, node, previousName, *args):
+        '''
+        name changed callback, the cached dag path string is outdated
+        '''
+        self.dirty = True
+
+    def onRemoval(self, node, *args):
+        '''
+        node removal callback, the prototype must not be used anymore
+        '''
+        self.valid = False
+
+    def release(self):
+        '''
+        remove the callbacks
+        '''
+        removeCallbacks(self.nodeCallbackIDs)
+        removeCallbacks(self.pathCallbackIDs)
+
+
+
+class sourceCache (object):
+    '''
+    store a sourcePrototype per source object, keyed by the source dag string of the sp3dObjectList.obj data
+    '''
+    def __init__(self):
+        '''
+        initial setup
+        '''
+        self.entries = {}
+
+    def register(self, sourcedag):
+        '''
+        create (or replace) the prototype of sourcedag and query its metadata
+        return None if sourcedag doesn't exist in the scene or has no transform to duplicate
+        '''
+        self.release(sourcedag)
+        if (not sourcedag or not mc.objExists(sourcedag)): return None
+        transformdag = getCloneTarget(sourcedag)
+        if (not transformdag): return None
+        prototype = sourcePrototype(sourcedag, transformdag)
+        prototype.build()
+        self.entries[sourcedag] = prototype
+        return prototype
+
+    def release(self, sourcedag):
+        '''
+        drop the prototype of sourcedag if any
+        '''
+        prototype = self.entries.pop(sourcedag, None)
+        if (prototype): prototype.release()
+
+    def clear(self):
+        '''
+        drop all the prototypes
+        '''
+        for sourcedag in list(self.entries.keys()):
+            self.release(sourcedag)
+
+    def get(self, sourcedag):
+        '''
+        return an up to date prototype of sourcedag, registering it first if the source wasn't known yet (or was deleted)
+        return None if the source can't be found in the scene
+        '''
+        prototype = self.entries.get(sourcedag)
+        if (not prototype or not prototype.refresh()):
+            return self.register(sourcedag)
+        return prototype
+
+#module wide source cache, fed by sp3dObjectList.addObj and read by every placement
+sp3dSourceCache = sourceCache()
+
+
+
+class strokeView (object):
+    '''
+    snapshot of the viewport and scene data used to cast rays, captured once per stroke by the contexts
+    '''
+    def __init__(self):
+        '''
+        initial setup and first capture
+        '''
+        self.activeView = None      #M3dView the stroke is painted in
+        self.cameraPath = None      #MDagPath of the view camera
+        self.farClip = 1.0          #camera far clip plane, max distance of the rays
+        self.unit = 'cm'            #current scene linear unit
+        self.unitFactor = 1.0       #factor from internal cm to self.unit (see getUnitFactor)
+        self.worldUp = None         #MVector of the scene up axis, None if it couldn't be determined
+        self.cameraMoved = False    #set by the camera world matrix callback, camera data is refreshed on the next access
+        self.callbackIDs = []       #camera world matrix callback id
+        self.capture()
+
+    def capture(self):
+        '''
+        capture the active view, its camera and the scene up axis & unit, called at stroke start
+        '''
+        self.activeView = omui.M3dView.active3dView()
+
+        axis = mc.upAxis(q=True, axis=True)
+        if (axis == "y"): self.worldUp = om.MVector(0, 1, 0)
+        elif (axis == "z"): self.worldUp = om.MVector(0, 0, 1)
+        else: self.worldUp = None
+
+        self.unit = mc.currentUnit(query=True, linear=True)
+        self.unitFactor = getUnitFactor(self.unit)
+
+        removeCallbacks(self.callbackIDs)
+        self.cameraPath = self.activeView.getCamera()
+        self.callbackIDs.append(om.MDagMessage.addWorldMatrixModifiedCallback(self.cameraPath, self.onCameraModified))
+        self.updateCamera()
+
+    def updateCamera(self):
+        '''
+        refresh the far clip from the cached camera path
+        '''
+        self.farClip = om.MFnCamera(self.cameraPath).farClippingPlane
+        self.cameraMoved = False
+
+    def onCameraModified(self, transform, modified, *args):
+        '''
+        camera world matrix callback (tumble/track/dolly during a stroke)
+        '''
+        self.cameraMoved = True
+
+    def getFarClip(self):
+        '''
+        return the camera far clip, refreshed only if the camera moved since the last access
+        '''
+        if (self.cameraMoved): self.updateCamera()
+        return self.farClip
+
+    def getViewportClick(self, screenX, screenY):
+        '''
+        return world position and direction of the screen point in the captured view (see getViewportClick)
+        '''
+        if (self.cameraMoved): self.updateCamera()
+        return getViewportClick(screenX, screenY, self.activeView)
+
+    def getViewportClicks(self, screenPoints):
+        '''
+        return world positions and directions of a list of screen points in the captured view (see getViewportClicks)
+        '''
+        if (self.cameraMoved): self.updateCamera()
+        return getViewportClicks(screenPoints, self.activeView)
+
+    def release(self):
+        '''
+        remove the camera callback at stroke end, next capture() registers it again
+        '''
+        removeCallbacks(self.callbackIDs)
+
+
+class strokeLocality (object):
+    '''
+    stroke-local ray casting: the faces around the previous hit of the stroke are tested first,
+    the full target query only runs when none of the grown face rings is hit
+    '''
+    def __init__(self, rings=sp3dLocalRings):
+        '''
+        initial setup
+        '''
+        self.rings = rings      #number of face rings grown around the previous hit face
+        self.lastKey = None     #targetList key of the target hit by the previous ray of the stroke
+        self.lastFace = -1      #face hit by the previous ray of the stroke
+
+    def reset(self):
+        '''
+        forget the previous hit, called at stroke start
+        '''
+        self.lastKey = None
+        self.lastFace = -1
+
+    def intersect(self, targetList, clickPos, clickDir, farclip, hitBuffer):
+        '''
+        same as getClosestTargetHit, testing the face rings around the previous hit first
+        the other targets are still tested (up to the local hit distance) since they may hide the local hit
+        '''
+        closest = self.intersectRings(targetList, clickPos, clickDir, farclip, hitBuffer)
+        if (closest):
+            other = getClosestTargetHit(targetList, clickPos, clickDir, closest[0], hitBuffer, self.lastKey)
+            if (other): closest = other
+        else:
+            closest = getClosestTargetHit(targetList, clickPos, clickDir, farclip, hitBuffer)
+
+        if (closest):
+            self.lastKey = closest[1]
+            self.lastFace = closest[4]
+        else:
+            self.reset()
+        return closest
+
+    def intersectRings(self, targetList, clickPos, clickDir, farclip, hitBuffer):
+        '''
+        test the previous hit face, then the rings of connected faces around it, until a ring is hit or self.rings rings were tested
+        return the same tuple as getClosestTargetHit, None if none of the rings is hit
+        '''
+        if (self.lastKey not in targetList.obj): return None
+        target = sp3dTargetCache.get(self.lastKey, targetList.obj[self.lastKey][0])
+        if (not target or not target.isValid() or self.lastFace >= target.fnMesh.numPolygons): return None
+
+        raySource = clickPos.asMFPoint()
+        rayDir = clickDir.asMFVector()
+        rayLength = rayDir.length()
+        ring = om.MIntArray()
+        ring.append(self.lastFace)
+        visited = set([self.lastFace])
+        for i in range(self.rings + 1):
+            if (hitBuffer.intersect(target, raySource, rayDir, farclip / rayLength, ring)):
+                if (sp3d_MFn): print ("Local Hit: ring %i || Face Hit: %i" % (i, hitBuffer.getFace()))
+                return hitBuffer.getClosest(hitBuffer.getParam() * rayLength, self.lastKey, target)
+            ring = self.getNextRing(target, ring, visited)
+            if (not len(ring)): break
+        return None
+
+    def getNextRing(self, target, ring, visited):
+        '''
+        return the faces connected to the ring faces which weren't visited yet (MIntArray), visited is updated
+        '''
+        itMesh = om.MItMeshPolygon(target.dagPath)
+        nextRing = om.MIntArray()
+        for face in ring:
+            itMesh.setIndex(face)
+            for connected in itMesh.getConnectedFaces():
+                if (connected not in visited):
+                    visited.add(connected)
+                    nextRing.append(connected)
+        return nextRing
+
+
+
+class mayaRaycastBackend (object):
+    '''
+    ray casting engine used by targetSurfaceLoopIntersect & targetSurfaceBatchIntersect (see sp3dRaycastBackends), the other backends override it
+    MFnMesh.closestIntersection on the targets crossed by the ray (box index culling, near to far early out, optional stroke-local rings)
+    '''
+    name = 'maya'       #short name, used in logs
+    label = 'Maya API'  #name displayed in the setup window
+
+    def isAvailable(self):
+        '''
+        return True if the backend can run in this maya session
+        '''
+        return True
+
+    def prepare(self, targetList):
+        '''
+        build whatever the backend needs to intersect targetList, called at stroke start
+        '''
+        sp3dTargetCache.prepare(targetList)
+
+    def intersect(self, targetList, clickPos, clickDir, farclip, locality=None):
+        '''
+        return the closest intersectionPoint of the ray with the targetList objects, None if no intersection found
+        '''
+        if (locality): closest = locality.intersect(targetList, clickPos, clickDir, farclip, rayHitBuffer())
+        else: closest = getClosestTargetHit(targetList, clickPos, clickDir, farclip, rayHitBuffer())
+        if (not closest): return None
+        distance, obj, target, hitPoint, hitFace, hitTriangle, hitBary = closest
+        return intersectionPoint(hitPoint, hitFace, hitTriangle, target.dagPath, target.fnMesh, target, hitBary)
+
+    def batchIntersect(self, targetList, clickPositions, clickDirections, farclip, locality=None):
+        '''
+        return an intersectionBatch holding the closest hit of every ray, the rays are cast in order through the optional locality (strokeLocality)
+        '''
+        return mayaSurfaceBatchIntersect(targetList, clickPositions, clickDirections, farclip, locality)
+
+
+
+class bvhRaycastBackend (mayaRaycastBackend):
+    '''
+    spPaint3dBVH2025 two level hierarchy over the world space triangles of all the targets (see targetCache.updateBVH), needs numpy
+    the hierarchy is only rebuilt at stroke start (prepare), the rays go through the maya backend whenever it isn't up to date
+    '''
+    name = 'bvh'
+    label = 'BVH (numpy)'
+
+    def isAvailable(self):
+        '''
+        see mayaRaycastBackend.isAvailable
+        '''
+        return sp3dBVH is not None
+
+    def prepare(self, targetList):
+        '''
+        see mayaRaycastBackend.prepare, also rebuilds the hierarchy of the targets edited or moved since the last stroke
+        '''
+        sp3dTargetCache.prepare(targetList)
+        sp3dTargetCache.updateBVH(targetList)
+
+    def intersect(self, targetList, clickPos, clickDir, farclip, locality=None):
+        '''
+        see mayaRaycastBackend.intersect, locality is only used by the maya backend fallback while the hierarchy isn't up to date
+        '''
+        if (sp3dTargetCache.getBVH(targetList) is None): return mayaRaycastBackend.intersect(self, targetList, clickPos, clickDir, farclip, locality)
+        return bvhSurfaceIntersect(targetList, clickPos, clickDir, farclip)
+
+    def batchIntersect(self, targetList, clickPositions, clickDirections, farclip, locality=None):
+        '''
+        see mayaRaycastBackend.batchIntersect, locality is only used by the maya backend fallback while the hierarchy isn't up to date
+        '''
+        if (sp3dTargetCache.getBVH(targetList) is None): return mayaRaycastBackend.batchIntersect(self, targetList, clickPositions, clickDirections, farclip, locality)
+        return bvhSurfaceBatchIntersect(targetList, clickPositions, clickDirections, farclip)
+
+#available raycast backends, the index in this list is the value stored in the sp3dRaycastBackend optionVar
+sp3dRaycastBackends = [mayaRaycastBackend(), bvhRaycastBackend()]
+
+#active raycast backend, see setRaycastBackend
+sp3dRaycastBackend = sp3dRaycastBackends[0]
+
+
+
+class refreshScheduler (object):
+    '''
+    coalesce the viewport redraws requested by the contexts events to a target rate and measure their cost
+    the redraw interval adapts to the measured cost so redrawing never takes more than half of the events time
+    '''
+    def __init__(self, rate=sp3dRefreshRate):
+        '''
+        initial setup
+        '''
+        self.rate = rate                #target redraws per second, 0 to redraw on every request
+        self.timestamp = None           #timerX of the last redraw
+        self.cost = 0.0                 #average redraw duration in seconds
+        self.redraws = 0                #number of redraws of the stroke
+        self.skipped = 0                #number of redraw requests skipped during the stroke
+        self.errorHandle = None         #GUI sp3derror used to report the redraw cost, set by the GUI
+
+    def reset(self, rate=None):
+        '''
+        new stroke: reset the counters, optionally with a new target rate
+        '''
+        if (rate is not None): self.rate = rate
+        self.timestamp = None
+        self.redraws = 0
+        self.skipped = 0
+
+    def getInterval(self):
+        '''
+        return the min delay in seconds between two redraws
+        '''
+        if (self.rate <= 0): return 0.0
+        return max(1.0 / self.rate, 2.0 * self.cost)
+
+    def request(self, pending=False):
+        '''
+        redraw the viewport if the last redraw is older than the redraw interval
+        pending is True while placements are queued for creation, nothing new to see until they are created
+        return True if the viewport was redrawn
+        '''
+        if (pending or (self.timestamp is not None and mc.timerX(startTime=self.timestamp) < self.getInterval())):
+            self.skipped += 1
+            return False
+        self.redraw()
+        return True
+
+    def redraw(self):
+        '''
+        redraw the viewport now and update the average redraw cost
+        '''
+        start = mc.timerX()
+        forceRefresh()
+        elapsed = mc.timerX(startTime=start)
+        #moving average, the first redraw seeds it
+        self.cost = elapsed if (not self.redraws and not self.cost) else (0.8 * self.cost + 0.2 * elapsed)
+        self.redraws += 1
+        self.timestamp = mc.timerX()
+
+    def release(self):
+        '''
+        stroke end: always redraw and report the redraw cost
+        '''
+        self.redraw()
+        if (self.errorHandle): self.errorHandle.raiseError(self.getReport())
+
+    def getReport(self):
+        '''
+        return the redraw statistics of the stroke as a string
+        '''
+        return "Redraw: %.1f ms avg | %i drawn, %i skipped" % (self.cost * 1000.0, self.redraws, self.skipped)
+
+
+
+class strokePath (object):
+    '''
+    screen space drag samples of a paint stroke, walked along their surface hits to place objects at exact distance spacing
+    '''
+    def __init__(self):
+        '''
+        initial setup
+        '''
+        self.samples = []       #(x, y) drag points not processed yet
+        self.last = None        #((x, y), point) screen position and hit point of the last processed sample, None before the first hit
+        self.travelled = 0.0    #path length between the last placement and self.last
+
+    def reset(self, screenPoint=None, hitPoint=None):
+        '''
+        new stroke, optionally starting at screenPoint where hitPoint was placed
+        '''
+        self.samples = []
+        self.last = None
+        if (screenPoint is not None): self.last = (tuple(screenPoint), point(hitPoint.x, hitPoint.y, hitPoint.z))
+        self.travelled = 0.0
+
+    def addSample(self, x, y):
+        '''
+        record a drag point, kept until the next processing even when the drag event itself is dropped
+        '''
+        self.samples.append((x, y))
+
+    def take(self):
+        '''
+        return the drag points recorded since the last call and forget them
+        '''
+        samples = self.samples
+        self.samples = []
+        return samples
+
+    def resample(self, hits, spacing):
+        '''
+        walk the path through the hits ((x, y), point) list and return the ((x, y), hit number) positions found every spacing path length since the last placement
+        the hit number is the index in hits of the hit the position lands on (its ray doesn't need to be cast again), -1 for a position between two hits
+        the path positions are interpolated linearly between two hits, the first hit only starts the path if there is no previous one
+        '''
+        screenPoints = []
+        for hitNumber, (screenPoint, hitPoint) in enumerate(hits):
+            if (self.last is None):
+                self.last = (screenPoint, hitPoint)
+                continue
+
+            startScreen, startHit = self.last
+            length = getDistanceBetween(startHit, hitPoint)
+            position = 0.0 #path length already walked on the segment
+            while (length > 0.0 and self.travelled + length - position >= spacing):
+                position += spacing - self.travelled
+                self.travelled = 0.0
+                if (length - position <= sp3dPathTolerance * length):
+                    #landing on the hit itself
+                    screenPoints.append((screenPoint, hitNumber))
+                    position = length
+                    break
+                ratio = position / length
+                screenPoints.append(((startScreen[0] + ratio * (screenPoint[0] - startScreen[0]), startScreen[1] + ratio * (screenPoint[1] - startScreen[1])), -1))
+            self.travelled += length - position
+            self.last = (screenPoint, hitPoint)
+
+        return screenPoints
+
+
+
+class placementQueue (object):
+    '''
+    placements of a paint stroke waiting for their objects to be created, flushed in batches by paintContext.flushPlacements
+    '''
+    def __init__(self, size=sp3dFlushSize, delay=sp3dFlushDelay):
+        '''
+        initial setup
+        '''
+        self.size = size            #number of queued placements triggering a flush
+        self.delay = delay          #seconds after the first queued placement triggering a flush
+        self.pending = []           #intersectionPoint objects waiting for their object
+        self.timestamp = None       #timerX of the first queued placement
+
+    def add(self, intersection):
+        '''
+        queue the intersection
+        '''
+        if (not self.pending): self.timestamp = mc.timerX()
+        self.pending.append(intersection)
+
+    def isDue(self):
+        '''
+        return True if enough placements are queued or the first one has been waiting long enough
+        '''
+        if (not self.pending): return False
+        return len(self.pending) >= self.size or mc.timerX(startTime=self.timestamp) >= self.delay
+
+    def take(self):
+        '''
+        return the queued placements and empty the queue
+        '''
+        pending = self.pending
+        self.pending = []
+        self.timestamp = None
+        return pending
+
+
+
+class rampEngine (object):
+    '''
+    ramp ratios applied to the placements of a paint stroke by the rampFX
+    the ratio of every placement changes with each new placement, only the ones which moved enough since they were last applied are re-applied
+    '''
+    def __init__(self, tolerance=sp3dRampTolerance, interval=sp3dRampInterval):
+        '''
+        initial setup
+        '''
+        self.tolerance = tolerance      #min ratio change for a placement to be re-applied while dragging
+        self.interval = interval        #min delay in seconds between two applications while dragging
+        self.applied = array.array('d') #ratio last applied per placement, -1 if never applied
+        self.timestamp = None           #timerX of the last application
+
+    def reset(self):
+        '''
+        new stroke: nothing applied yet
+        '''
+        self.applied = array.array('d')
+        self.timestamp = None
+
+    def getUpdates(self, count, final=False):
+        '''
+        return the list of (index, ratio) of the count placements to re-apply and record them as applied
+        final (stroke end) applies every ratio which changed and ignores the throttling
+        '''
+        if (not final and self.timestamp is not None and mc.timerX(startTime=self.timestamp) < self.interval): return []
+        tolerance = 0.0 if final else self.tolerance
+
+        if (len(self.applied) < count): self.applied.extend([-1.0] * (count - len(self.applied)))
+        updates = []
+        for index in range(count):
+            ratio = (index + 1.0) / count
+            applied = self.applied[index]
+            if (applied < 0 or abs(ratio - applied) > tolerance):
+                self.applied[index] = ratio
+                updates.append((index, ratio))
+
+        self.timestamp = mc.timerX()
+        return updates
+
+
+
+class pointInstancer (object):
+    '''
+    particle system driving a particleInstancer, receiving the paint strokes placements when the instancer output mode is on
+    every placement is a particle holding its rotation, scale and source index, instead of a transform node per placement
+    '''
+    def __init__(self, name=spPaint3dInstancerID):
+        '''
+        initial setup
+        '''
+        self.name = name                        #name of the instancer node, the particle system is named after it
+        self.particleName = name + 'Particles'  #name of the particle system transform
+        self.pending = {}                       #particle id -> (rotation, scale) waiting for the next flush (see setValues)
+
+    def getParticleShape(self):
+        '''
+        return the particle shape, create the particle system with its per particle attributes if it doesn't exist yet
+        '''
+        if (mc.objExists(self.particleName)):
+            return mc.listRelatives(self.particleName, shapes=True, fullPath=True)[0]
+
+        transform, shape = mc.particle(name=self.particleName)
+        for attr in ('rotationPP', 'scalePP'):
+            mc.addAttr(shape, longName=attr, dataType='vectorArray')
+            mc.addAttr(shape, longName=attr + '0', dataType='vectorArray')
+        mc.addAttr(shape, longName='indexPP', dataType='doubleArray')
+        mc.addAttr(shape, longName='indexPP0', dataType='doubleArray')
+        #the placements must not be simulated
+        mc.setAttr(shape + '.isDynamic', 0)
+        return mc.ls(shape, long=True)[0]
+
+    def getSources(self, shape):
+        '''
+        return the objects instanced by the instancer in their object index order, empty list if the instancer doesn't exist yet
+        '''
+        if (not mc.objExists(self.name)): return []
+        return mc.ls(mc.particleInstancer(shape, query=True, name=self.name, object=True) or [], long=True)
+
+    def getSourceIndices(self, shape, sources):
+        '''
+        return a dictionnary source -> object index in the instancer, adding the missing sources to the instancer (creating it if needed)
+        '''
+        instanced = self.getSources(shape)
+        for source in sources:
+            if (mc.ls(source, long=True)[0] in instanced): continue
+            if (not mc.objExists(self.name)):
+                mc.particleInstancer(shape, name=self.name, addObject=True, object=source, cycle='None', levelOfDetail='Geometry',
+                                     rotationUnits='Degrees', rotationOrder='XYZ', position='worldPosition',
+                                     rotation='rotationPP', scale='scalePP', objectIndex='indexPP')
+            else:
+                mc.particleInstancer(shape, edit=True, name=self.name, addObject=True, object=source)
+            instanced = self.getSources(shape)
 
-    def addPoint(self, ipoint):
+        return dict((source, instanced.index(mc.ls(source, long=True)[0])) for source in sources)
+
+    def append(self, sources, placements):
         '''
-        add a point to the list
+        emit one particle per (position, rotation, scale) placement instancing the matching sources item
+        return the list of the created particle ids
         '''
-        self.intersectionList.append(ipoint)
-        if(sp3d_log):
-            print ("adding a new intersection to intersectionList (length of list: %i)" % len(self.intersectionList))
-        #    self.printList()
+        shape = self.getParticleShape()
+        indices = self.getSourceIndices(shape, set(sources))
 
-    def getLength(self):
+        #a single emit call for the whole batch, the per particle values are only paired with their particle through MEL flags order
+        command = ['emit -object "%s"' % shape]
+        command.extend('-position %f %f %f' % (position.x, position.y, position.z) for position, rotation, scale in placements)
+        command.append('-attribute rotationPP')
+        command.extend('-vectorValue %f %f %f' % tuple(rotation) for position, rotation, scale in placements)
+        command.append('-attribute scalePP')
+        command.extend('-vectorValue %f %f %f' % tuple(scale) for position, rotation, scale in placements)
+        command.append('-attribute indexPP')
+        command.extend('-floatValue %i' % indices[source] for source in sources)
+        mm.eval(' '.join(command) + ';')
+
+        #keeping the particles when the time changes
+        mc.saveInitialState(shape)
+        #the emitted particles are the last ones of the system, their ids are read back instead of guessed from the count
+        particleIds = mc.getAttr(shape + '.particleId') or []
+        return [int(particleId) for particleId in particleIds[len(particleIds) - len(placements):]]
+
+    def setValues(self, particleIds, rotations, scales):
         '''
-        return the length of the sel.intersectionList
+        store the rotation and scale of the particleIds particles (used by the rampFX), written by the next flush()
         '''
-        return len(self.intersectionList)
-    
-    def getClosest(self, sortorigin):
+        for particleId, rotation, scale in zip(particleIds, rotations, scales):
+            self.pending[particleId] = (tuple(rotation), tuple(scale))
+
+    def flush(self):
         '''
-        will parse the list to return the closest intersectionPoint to the sortorigin argument
-        return None if the list is empty
+        write the pending rotations and scales in a single update of the per particle arrays, called at stroke end
+        the particles are matched by their particleId value, not by their index in the arrays
         '''
-        length = len(self.intersectionList)
-        closestintersection = None
-        closestdistance = None
+        if (not self.pending or not mc.objExists(self.particleName)):
+            self.pending = {}
+            return
+        shape = self.getParticleShape()
+        particleIndices = dict((int(particleId), index) for index, particleId in enumerate(mc.getAttr(shape + '.particleId') or []))
+        for attr, slot in (('rotationPP', 0), ('scalePP', 1)):
+            current = [tuple(value) for value in (mc.getAttr(shape + '.' + attr) or [])]
+            for particleId, values in self.pending.items():
+                index = particleIndices.get(particleId)
+                if (index is not None and index < len(current)): current[index] = values[slot]
+            mc.setAttr(shape + '.' + attr, len(current), *current, type='vectorArray')
+        mc.saveInitialState(shape)
+        self.pending = {}
 
-        if (length==0): return None
-        elif (length==1): return self.intersectionList[0]
-        else:
-            #list is at least 2 intersections
-            for intersection in self.intersectionList:
-                if not closestintersection:
-                    #first intersection considered
-                    closestintersection = intersection
-                    closestdistance = getDistanceBetween(intersection.hitPoint, sortorigin)
-                else:
-                    #compare distances
-                    newdistance = getDistanceBetween(intersection.hitPoint, sortorigin)
-                    if ( newdistance < closestdistance):
-                        #new closest
-                        closestintersection = intersection
-                        closestdistance = newdistance
-            #at this point there must be a closesintersetcion
-            return closestintersection
 
-    def printList(self):
-        '''
-        debug: print the dag of all objects in the list
-        '''
-        for obj in self.intersectionList:
-            print ("object created: %s (using source: %s)" % (obj.generatedDAG, obj.dagMeshSourceObject))
+
+#point instancer receiving the paint strokes placements in instancer output mode
+sp3dPointInstancer = pointInstancer()
+
 
 
 class modifierManager (object):
@@ -329,7 +1612,7 @@ class placeCursor (object):
     '''
     define a cursor object for use with placeContext
     '''
-    def __init__(self, sourcedag=None, cursordag=None):
+    def __init__(self, sourcedag=None, cursordag=None, prototype=None, proxy=False):
         '''
         initialize variables
         '''
@@ -338,23 +1621,31 @@ class placeCursor (object):
         self.rotationIncrement=None
         self.initialScale=[1,1,1]
         self.cursorAlign=None
+        self.prototype=None #sourcePrototype of the cursor source, None if the source couldn't be resolved
+        self.proxy=False #True while the cursor is a proxy of the source (see createProxyCursor), replaced by the real object with self.realize()
         if(sourcedag and cursordag):
-            self.setCursorDAG(sourcedag, cursordag)
+            self.setCursorDAG(sourcedag, cursordag, prototype=prototype, proxy=proxy)
 
-    def setCursorDAG(self, sourcedag, cursordag, deleteprevious=False):
+    def setCursorDAG(self, sourcedag, cursordag, deleteprevious=False, prototype=None, proxy=False):
         '''
         update the cursor dag
+        the source position and the cursor initial scale are read from the prototype of the source when given
         '''
         self.sourceDAG = sourcedag
-        self.sourceDAGPos = getPosition(sourcedag)
+        if (prototype): self.sourceDAGPos = point(prototype.pivotOffset.x, prototype.pivotOffset.y, prototype.pivotOffset.z)
+        else: self.sourceDAGPos = getPosition(sourcedag)
         if (deleteprevious):
             if(mc.objExists(self.cursorDAG)):
-                #deleting the previous cursor object and its parent group if it's empty
-                parentgroup = mc.listRelatives(self.cursorDAG, parent=True)
-                mc.delete(self.cursorDAG)
-                if (not mc.listRelatives(parentgroup)): mc.delete(parentgroup)
+                #recycling (or deleting) the previous cursor object and deleting its parent group if it's empty
+                parentgroup = mc.listRelatives(self.cursorDAG, parent=True, fullPath=True)
+                if (self.proxy or not sp3dCursorPool.recycle(self.cursorDAG, self.prototype)): mc.delete(self.cursorDAG)
+                if (parentgroup and not mc.listRelatives(parentgroup)): mc.delete(parentgroup)
         self.cursorDAG = cursordag
-        self.initialScale=mc.xform(self.cursorDAG, query=True, scale=True, r=True)
+        self.prototype = prototype
+        self.proxy = proxy
+        #a fresh duplicate keeps the source scale
+        if (prototype): self.initialScale = list(prototype.scale)
+        else: self.initialScale=mc.xform(self.cursorDAG, query=True, scale=True, r=True)
 
     def setCursorTransform(self, rotate, scale):
         '''
@@ -370,15 +1661,43 @@ class placeCursor (object):
         if (not position):
             #reseting current position to previously stored position if any
             if (self.position):
-                moveTo(self.cursorDAG, self.position)
+                moveTo(self.cursorDAG, self.position, pivotOffset=self.getPivotOffset())
                 if (rotation):
                     mc.rotate(self.rotationIncrement[0], self.rotationIncrement[1], self.rotationIncrement[2], self.cursorDAG, os=True, r=True, rotateXYZ=True)
         else:
             self.position = position
-            moveTo(self.cursorDAG, position)
+            moveTo(self.cursorDAG, position, pivotOffset=self.getPivotOffset())
             if (rotation):
                 mc.rotate(self.rotationIncrement[0], self.rotationIncrement[1], self.rotationIncrement[2], self.cursorDAG, os=True, r=True, rotateXYZ=True)
 
+    def realize(self, objectdag):
+        '''
+        replace the proxy cursor with objectdag, a new object of the cursor source: it gets the parent and transform values of the proxy, the proxy is deleted
+        '''
+        parent = mc.listRelatives(self.cursorDAG, parent=True, fullPath=True)
+        if (parent != mc.listRelatives(objectdag, parent=True, fullPath=True)):
+            if (parent): objectdag = mc.parent(objectdag, parent[0], relative=True)[0]
+            else: objectdag = mc.parent(objectdag, world=True, relative=True)[0]
+            objectdag = mc.ls(objectdag, long=True)[0]
+
+        #the proxy has the pivots of the source, the same transform values give the same placement
+        translation = mc.xform(self.cursorDAG, query=True, translation=True)
+        rotation = mc.xform(self.cursorDAG, query=True, rotation=True)
+        scale = mc.xform(self.cursorDAG, query=True, scale=True, r=True)
+        mc.xform(objectdag, translation=translation, rotation=rotation, scale=scale)
+
+        mc.delete(self.cursorDAG)
+        self.cursorDAG = objectdag
+        self.proxy = False
+
+    def getPivotOffset(self):
+        '''
+        return the cached pivot offset of the cursor (see moveTo), None when it has to be queried on the cursor itself
+        rotating or scaling the cursor only moves its pivot when the source pivots aren't at the origin
+        '''
+        if (self.prototype and self.prototype.fixedPivot): return self.prototype.pivotOffset
+        return None
+
     def rotateCursor(self, increment):
         '''
         rotate the cursor object
@@ -427,6 +1746,168 @@ class placeCursor (object):
             mc.setAttr(self.cursorDAG+'.overrideEnabled', 0)
             mc.setAttr(self.cursorDAG+'.overrideDisplayType', 0)
 
+class cursorPool (object):
+    '''
+    hidden cursor candidates of the place mode, duplicated at idle time so a new cursor can be swapped in without waiting for the duplication
+    the candidates are hidden with their lodVisibility (their visibility is left to the source / forceVisibility option) and kept out of the undo queue,
+    so undo doesn't delete a placed cursor taken from the pool: the pool is an opt-in setup option (cursorPoolDepth)
+    the candidates are deleted before the scene is saved, they never end up in the user file, and are only duplicated again from the next stroke on
+    '''
+    def __init__(self):
+        '''
+        initial setup
+        '''
+        self.candidates = {}    #source dag string (as stored in the sp3dObjectList.obj data) -> list of hidden candidate dag strings
+        self.sources = []       #source dag strings to keep warm, in filling order, see self.prepare()
+        self.options = None     #(instance, preserveConn) ui values the candidates were created with
+        self.scheduled = False  #True while an idle time filling is pending
+        self.depth = sp3dCursorPoolDepth  #hidden candidates kept per source, 0 when the pool is off
+        self.saveCallbackIDs = []   #before save scene callback deleting the candidates, bound while there are candidates
+        self.paused = False     #True from a scene save to the next stroke, the filling would leave the saved scene modified
+
+    def prepare(self, sourceList, uiValues):
+        '''
+        set the sources to keep warm (the next ones of the sequential distribution first) and schedule the filling at idle time
+        the candidates of the sources no longer kept warm, or created with other instance/duplicate options, are deleted
+        '''
+        self.depth = max(0, int(getattr(uiValues, 'cursorPoolDepth', sp3dCursorPoolDepth)))
+        options = (bool(uiValues.instance), bool(uiValues.preserveConn))
+        if (options != self.options or not self.depth):
+            self.clear()
+            self.options = options
+        if (not self.depth):
+            self.sources = []
+            return
+
+        keys = sourceList.getSortedKeys()
+        if (keys):
+            start = sourceList.i % len(keys)
+            keys = keys[start:] + keys[:start]
+        self.sources = [sourceList.obj[key][0] for key in keys[:sp3dCursorPoolSize]]
+
+        for sourcedag in list(self.candidates.keys()):
+            if (sourcedag not in self.sources): self.delete(self.candidates.pop(sourcedag))
+        self.paused = False
+        self.schedule()
+
+    def schedule(self):
+        '''
+        fill the pool at the next idle time
+        '''
+        if (self.scheduled or self.paused or not self.depth): return
+        self.scheduled = True
+        mc.evalDeferred(self.fill, lowestPriority=True)
+
+    def fill(self):
+        '''
+        idle time callback: create a single missing candidate, and schedule again until the pool is full
+        '''
+        self.scheduled = False
+        if (self.paused): return
+        for sourcedag in self.sources:
+            if (len(self.getCandidates(sourcedag)) >= self.depth): continue
+            candidate = self.create(sourcedag)
+            if (candidate):
+                self.candidates.setdefault(sourcedag, []).append(candidate)
+                self.schedule()
+                return
+
+    def create(self, sourcedag):
+        '''
+        duplicate (or instance) a hidden candidate of sourcedag, return its dag string or None if the source can't be found
+        '''
+        prototype = sp3dSourceCache.get(sourcedag)
+        if (not prototype or not self.options): return None
+        instance, preserveConn = self.options
+
+        if (not self.saveCallbackIDs):
+            self.saveCallbackIDs.append(om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeSave, self.onSceneSave))
+        if (instance): candidate = getTopLevelNode(self.runWithoutUndo(mc.instance, prototype.transformDAG))
+        else: candidate = getTopLevelNode(self.runWithoutUndo(mc.duplicate, prototype.transformDAG, ic=preserveConn))
+        self.runWithoutUndo(mc.setAttr, candidate+'.lodVisibility', 0)
+        if (sp3d_place): print ("cursor candidate created for %s: %s" % (sourcedag, candidate))
+        return candidate
+
+    def getCandidates(self, sourcedag):
+        '''
+        return the list of candidates of sourcedag, forgetting the ones deleted in the meantime (new scene...)
+        '''
+        candidates = [candidate for candidate in self.candidates.get(sourcedag, []) if mc.objExists(candidate)]
+        self.candidates[sourcedag] = candidates
+        return candidates
+
+    def take(self, sourcedag):
+        '''
+        return a ready candidate of sourcedag shown back, or None if there isn't any (the caller has to duplicate the source itself)
+        the pool is filled again at the next idle time
+        '''
+        candidates = self.getCandidates(sourcedag)
+        candidate = candidates.pop(0) if candidates else None
+        #shown back outside of the undo queue too, undoing the placement must not hide it again
+        if (candidate): self.runWithoutUndo(mc.setAttr, candidate+'.lodVisibility', 1)
+        self.paused = False
+        self.schedule()
+        return candidate
+
+    def recycle(self, cursordag, prototype):
+        '''
+        put a cursor that isn't used anymore back into the pool instead of deleting it
+        the cursor gets back the parent, rotation and scale of its source, return False if the pool doesn't need it (the caller has to delete it)
+        '''
+        if (not prototype or prototype.registeredDAG not in self.sources): return False
+        if (len(self.getCandidates(prototype.registeredDAG)) >= self.depth): return False
+
+        sourceParent = mc.listRelatives(prototype.transformDAG, parent=True, fullPath=True)
+        if (sourceParent != mc.listRelatives(cursordag, parent=True, fullPath=True)):
+            if (sourceParent): cursordag = self.runWithoutUndo(mc.parent, cursordag, sourceParent[0])[0]
+            else: cursordag = self.runWithoutUndo(mc.parent, cursordag, world=True)[0]
+            cursordag = mc.ls(cursordag, long=True)[0]
+        rotation = prototype.rotation
+        self.runWithoutUndo(mc.xform, cursordag, rotation=(math.degrees(rotation.x), math.degrees(rotation.y), math.degrees(rotation.z)), scale=prototype.scale)
+        self.runWithoutUndo(mc.setAttr, cursordag+'.lodVisibility', 0)
+        self.candidates.setdefault(prototype.registeredDAG, []).append(cursordag)
+        return True
+
+    def delete(self, candidates):
+        '''
+        delete the candidates still in the scene
+        '''
+        candidates = [candidate for candidate in candidates if mc.objExists(candidate)]
+        if (candidates): self.runWithoutUndo(mc.delete, candidates)
+
+    def runWithoutUndo(self, command, *args, **kwargs):
+        '''
+        run a maya command outside of the undo queue and return its result, the pool bookkeeping must not show up in the user undo steps
+        '''
+        undoState = mc.undoInfo(query=True, stateWithoutFlush=True)
+        mc.undoInfo(stateWithoutFlush=False)
+        try:
+            return command(*args, **kwargs)
+        finally:
+            mc.undoInfo(stateWithoutFlush=undoState)
+
+    def clear(self):
+        '''
+        delete all the candidates, used when the place tool is exited
+        '''
+        for sourcedag in list(self.candidates.keys()):
+            self.delete(self.candidates.pop(sourcedag))
+        removeCallbacks(self.saveCallbackIDs)
+
+    def onSceneSave(self, *args):
+        '''
+        before save scene callback, the hidden candidates are deleted and the filling waits for the next stroke (see prepare and take)
+        refilling right after the save would mark the just saved scene as modified, the callback itself stays bound for the next saves
+        '''
+        for sourcedag in list(self.candidates.keys()):
+            self.delete(self.candidates.pop(sourcedag))
+        self.paused = True
+
+#module wide cursor pool of the place context
+sp3dCursorPool = cursorPool()
+
+
+
 class placeContext (object):
     '''
     define placeContext
@@ -463,6 +1944,7 @@ class placeContext (object):
             dragCommand=self.onDrag,
             holdCommand=self.onHold,
             releaseCommand=self.onRelease,
+            finalize=self.onExit,
             name=spPaint3dContextID,
             cursor='crossHair',
             undoMode='step'
@@ -471,17 +1953,17 @@ class placeContext (object):
         # create context local options
         self.runtimeUpdate(uioptions, transformoptions, sourcelist, targetlist)
 
-        # initialise world up vector
-        if (mc.upAxis(q=True, axis=True)) == "y":
-            self.worldUp = om.MVector(0, 1, 0)
-        elif (mc.upAxis(q=True, axis=True)) == "z":
-            self.worldUp = om.MVector(0, 0, 1)
-
-        # fetch current scene unit
-        self.unit = mc.currentUnit(query=True, linear=True)
+        # view, world up vector and scene unit snapshot, captured again at every stroke start
+        self.view = strokeView()
+        self.locality = strokeLocality() #previous hit of the stroke, used when the stroke-local raycast option is on
+        self.refresh = refreshScheduler() #viewport redraws of the stroke
+        self.worldUp = self.view.worldUp
+        self.unit = self.view.unit
 
         self.reentrance = 0
         self.mState = modifierManager()
+        self.prototype = None #sourcePrototype of the last fetched cursor source, see fetchCursorObject
+        self.proxy = False #True when the last fetched cursor is a proxy of its source (proxy cursor option)
 
         # important: default tempgroup handle
         self.tempgroup = None
@@ -503,46 +1985,22 @@ class placeContext (object):
         if self.uiValues.random:
             # Use weighted selection if weights are available
             useWeights = len(self.uiValues.sourceWeights) > 0
-            sourceDAG = self.sourceList.getRandom(weighted=useWeights, sourceWeights=self.uiValues.sourceWeights)
+            sourceDAG = self.sourceList.getRandom(weighted=useWeights, sourceWeights=self.uiValues.sourceWeights, stream=self.transform.random)
         else:
             sourceDAG = self.sourceList.getNext()
 
-        # ensure we work with a transform
-        if mc.nodeType(sourceDAG) != 'transform':
-            temp = mc.listRelatives(sourceDAG, parent=True)
-            if temp:
-                sourceDAG = temp[0]
+        # ensure we work with a transform, resolved once per source (see sourcePrototype)
+        self.prototype = sp3dSourceCache.get(sourceDAG)
 
-        # create instance or duplicate
-        if self.uiValues.instance:
-            newObjectDAG = mc.instance(sourceDAG)
+        # proxy cursor option: a bounding box curve is dragged around, the object is created on release (see placeCursor.realize)
+        self.proxy = bool(self._is_true(self.uiValues.proxyCursor) and self.prototype)
+        if self.proxy:
+            newObjectDAG = [createProxyCursor(self.prototype)]
         else:
-            newObjectDAG = mc.duplicate(sourceDAG, ic=self.uiValues.preserveConn)
+            newObjectDAG = [self.createCursorObject(sourceDAG)]
 
-        # Always convert to long names (namespace-safe)
-        newObjectDAG = [mc.ls(obj, long=True)[0] for obj in newObjectDAG]
-
-        # When duplicating groups, Maya returns [group, child1, child2, ...] 
-        # We only need the top-level group/object (silently handle without warnings)
-        if len(newObjectDAG) > 1:
-            if mc.nodeType(newObjectDAG[0]) == 'transform':
-                newObjectDAG = [newObjectDAG[0]]
-            else:
-                fullPaths = [mc.ls(dag, long=True)[0] for dag in newObjectDAG]
-                topLevelNodes = []
-                for i, dag in enumerate(fullPaths):
-                    parents = mc.listRelatives(dag, parent=True, fullPath=True) or []
-                    isTopLevel = True
-                    for parent in parents:
-                        if parent in fullPaths:
-                            isTopLevel = False
-                            break
-                    if isTopLevel:
-                        topLevelNodes.append(newObjectDAG[i])
-                if topLevelNodes:
-                    newObjectDAG = [topLevelNodes[0]]
-                else:
-                    newObjectDAG = [newObjectDAG[0]]
+        if self.prototype:
+            sourceDAG = self.prototype.transformDAG
 
         # ensure created cursor object is visible if forceVisibility option is enabled
         if self.uiValues.forceVisibility:
@@ -562,6 +2020,26 @@ class placeContext (object):
         return sourceDAG, cursorDagOut
 
 
+    def createCursorObject(self, sourceDAG):
+        '''
+        return a new object (long name) of the sourceDAG source, as stored in the sp3dObjectList.obj data
+        a candidate duplicated at idle time is used if the cursor pool has one ready
+        '''
+        pooled = sp3dCursorPool.take(sourceDAG)
+        if pooled:
+            return pooled
+
+        # create instance or duplicate
+        if self.prototype:
+            sourceDAG = self.prototype.transformDAG
+        if self.uiValues.instance:
+            newObjectDAG = mc.instance(sourceDAG)
+        else:
+            newObjectDAG = mc.duplicate(sourceDAG, ic=self.uiValues.preserveConn)
+
+        # When duplicating groups, Maya returns [group, child1, child2, ...], we only need the top-level group/object
+        return getTopLevelNode(newObjectDAG)
+
     def fetchCursorTransform(self):
         '''
         compute transform data for cursor object and return the tuple for rotate and scale
@@ -588,7 +2066,7 @@ class placeContext (object):
         '''
         #fetching a new cursor
         newSourceDAG, newCursorDAG = self.fetchCursorObject()
-        self.cursor.setCursorDAG(newSourceDAG,newCursorDAG,True) #flagging to delete previous cursor
+        self.cursor.setCursorDAG(newSourceDAG,newCursorDAG,True,self.prototype,self.proxy) #flagging to delete previous cursor
         
         # Recalculate transforms with the new object's scale
         cursorRotate, cursorScale = self.fetchCursorTransform()
@@ -632,8 +2110,18 @@ class placeContext (object):
         self._sweep_empty_tempgroups()
         self.tempgroup = None
 
+        # stroke start: capturing the view once for all the events of the stroke
+        self.view.capture()
+        self.refresh.reset(self.uiValues.refreshRate)
+        # random values of the stroke, reproducible when a seed is set
+        self.transform.random.reset(int(self.uiValues.randomSeed) or None)
+        self.locality.reset()
+        setRaycastBackend(self.uiValues.raycastBackend)
+        self.worldUp = self.view.worldUp
+        self.unit = self.view.unit
+
         sourceDAG, cursorDAG = self.fetchCursorObject()
-        self.cursor = placeCursor(sourceDAG, cursorDAG)
+        self.cursor = placeCursor(sourceDAG, cursorDAG, self.prototype, self.proxy)
 
         cursorRotate, cursorScale = self.fetchCursorTransform()
         self.cursor.setCursorTransform(cursorRotate, cursorScale)
@@ -646,18 +2134,21 @@ class placeContext (object):
         '''
         pressPosition = mc.draggerContext(spPaint3dContextID, query=True, anchorPoint=True)
 
+        #stroke start: making sure all the target acceleration structures are built and up to date
+        sp3dRaycastBackend.prepare(self.targetList)
+
         #initializing / reseting the rotation increment if we are re-entering place
         self.cursor.rotationIncrement = 0
         
         ctrl, shift, alt = self.mState.getState()
 
-        worldPos, worldDir = getViewportClick(pressPosition[0],pressPosition[1])
+        worldPos, worldDir = self.view.getViewportClick(pressPosition[0],pressPosition[1])
 
-        intersected = targetSurfaceLoopIntersect(self.targetList, worldPos, worldDir)
+        intersected = targetSurfaceLoopIntersect(self.targetList, worldPos, worldDir, self.view.getFarClip(), self.getLocality())
         if(intersected):
             #there was a usable intersection found
             #first checking and converting units if necessary
-            intersected.convertUnit(self.unit)
+            intersected.convertUnit(self.unit, self.view.unitFactor)
             #now moving the cursor
             self.cursor.move(intersected.hitPoint)
             if(self.uiValues.align):
@@ -683,8 +2174,8 @@ class placeContext (object):
             #TODO
             #moving cursor to worldPos and aligning to worldDir
 
-        #forcing a viewport redraw
-        forceRefresh()
+        #viewport redraw (coalesced, see refreshScheduler)
+        self.refresh.request()
 
 
     def onDrag(self):
@@ -696,17 +2187,17 @@ class placeContext (object):
 
         dragPosition = mc.draggerContext(spPaint3dContextID, query=True, dragPoint=True)
 
-        worldPos, worldDir = getViewportClick(dragPosition[0],dragPosition[1])
+        worldPos, worldDir = self.view.getViewportClick(dragPosition[0],dragPosition[1])
 
         ctrl, shift, alt = self.mState.getState()
         #
         #TODO scale and rotate depending on mouse drag direction
         #
-        intersected = targetSurfaceLoopIntersect(self.targetList, worldPos, worldDir)
+        intersected = targetSurfaceLoopIntersect(self.targetList, worldPos, worldDir, self.view.getFarClip(), self.getLocality())
         if(intersected):
             #there was a usable intersection found
             #first checking and converting units if necessary
-            intersected.convertUnit(self.unit)
+            intersected.convertUnit(self.unit, self.view.unitFactor)
             #now moving the cursor
             if(self.uiValues.align):
                 rx, ry, rz = getEulerRotationQuaternion(self.worldUp, intersected.getHitNormal(self.uiValues.smoothNormal))
@@ -738,7 +2229,7 @@ class placeContext (object):
         if(shift):
             self.shiftEvent()
        
-        forceRefresh()
+        self.refresh.request()
         self.reentrance=0
 
     def onHold(self):
@@ -757,7 +2248,7 @@ class placeContext (object):
         if(shift):
             self.shiftEvent()
 
-        forceRefresh()
+        self.refresh.request()
 
         if sp3d_log:
             message = 'key press detected: '
@@ -773,6 +2264,16 @@ class placeContext (object):
         """
         on mouse release event: CLEANUP
         """
+        # stroke end: no need to track the camera anymore
+        self.view.release()
+
+        # proxy cursor: the object itself is only created now, where the proxy was dropped
+        if self.cursor.proxy:
+            newObjectDAG = self.createCursorObject(self.cursor.prototype.registeredDAG)
+            if self.uiValues.forceVisibility:
+                mc.setAttr(newObjectDAG + '.visibility', 1)
+            self.cursor.realize(newObjectDAG)
+
         # grouping
         if self._is_true(self.uiValues.hierarchy):
             g = int(self.uiValues.group)
@@ -806,6 +2307,18 @@ class placeContext (object):
         # secondary cleanup by NAME: remove any stale empty tempgroup left from earlier strokes
         self._clean_tempgroup_if_empty()
 
+        # the next cursor candidates are duplicated while the user isn't clicking
+        sp3dCursorPool.prepare(self.sourceList, self.uiValues)
+
+        # final redraw of the stroke
+        self.refresh.release()
+
+    def onExit(self):
+        '''
+        tool exit event, the hidden cursor candidates are deleted
+        '''
+        sp3dCursorPool.clear()
+
 
     def runtimeUpdate(self, uioptions, transformoptions, sourcelist, targetlist):
         '''
@@ -816,6 +2329,16 @@ class placeContext (object):
         self.sourceList = sourcelist
         self.targetList = targetlist
 
+        # the cursor candidates follow the source list and the instance/duplicate options
+        sp3dCursorPool.prepare(self.sourceList, self.uiValues)
+
+    def getLocality(self):
+        '''
+        return the strokeLocality used to cast the stroke rays, None when the stroke-local raycast option is off
+        '''
+        if (self.uiValues.localRaycast): return self.locality
+        return None
+
 class paintContext(object):
     '''
     define paintContext
@@ -831,6 +2354,7 @@ class paintContext(object):
             spPaint3dContextID,
             pressCommand=self.onPress,
             dragCommand=self.onDrag,
+            holdCommand=self.onHold,
             releaseCommand=self.onRelease,
             name=spPaint3dContextID,
             cursor='crossHair',
@@ -840,28 +2364,37 @@ class paintContext(object):
         # context local options
         self.runtimeUpdate(uioptions, transformoptions, sourcelist, targetlist)
 
+        # no place mode cursor candidates while painting
+        sp3dCursorPool.clear()
+
         # debug purpose
         self.reentrance = 0
 
-        # initialise world up vector
-        axis = mc.upAxis(q=True, axis=True)
-        if axis == "y":
-            self.worldUp = om.MVector(0, 1, 0)
-        elif axis == "z":
-            self.worldUp = om.MVector(0, 0, 1)
-        else:
+        # view, world up vector and scene unit snapshot, captured again at every stroke start
+        self.view = strokeView()
+        self.locality = strokeLocality() #previous hit of the stroke, used when the stroke-local raycast option is on
+        self.refresh = refreshScheduler() #viewport redraws of the stroke
+        if self.view.worldUp is None:
             mc.confirmDialog(
                 title='Weird stuff happening',
                 message='Not getting any proper info on what the current up vector is. Quitting...'
             )
             sys.exit()
-
-        # fetch current scene unit
-        self.unit = mc.currentUnit(query=True, linear=True)
+        self.worldUp = self.view.worldUp
+        self.unit = self.view.unit
 
         # tempgroup handle (lazy-created only when actually painting with hierarchy)
         self.tempgroup = None
 
+        # placements waiting for their object (deferred creation)
+        self.placements = placementQueue()
+
+        # ramp ratios applied to the stroke placements (rampFX)
+        self.ramp = rampEngine()
+
+        # drag samples of the stroke (distance flux)
+        self.path = strokePath()
+
     def runContext(self):
         '''
         set maya tool to the context
@@ -876,19 +2409,36 @@ class paintContext(object):
         if sp3d_dbg:
             logDebugInfo('entered paintContext onPress')
 
-        # initialise the intersection list that will contain all the created objects within the same stroke
-        self.strokeIntersectionList = intersectionList()
+        # initialise the buffer that will contain all the placements within the same stroke
+        self.strokeBuffer = strokeBuffer()
+        self.ramp.reset()
 
         # DO NOT create tempgroup here (avoid leftover in Place mode)
         self.tempgroup = None
 
+        # stroke start: making sure all the target acceleration structures are built and up to date
+        sp3dRaycastBackend.prepare(self.targetList)
+
+        # capturing the view once for all the events of the stroke
+        self.view.capture()
+        self.refresh.reset(self.uiValues.refreshRate)
+        # random values of the stroke, reproducible when a seed is set
+        self.transform.random.reset(int(self.uiValues.randomSeed) or None)
+        self.locality.reset()
+        setRaycastBackend(self.uiValues.raycastBackend)
+        self.worldUp = self.view.worldUp
+        self.unit = self.view.unit
+
         pressPosition = mc.draggerContext(spPaint3dContextID, query=True, anchorPoint=True)
-        worldPos, worldDir = getViewportClick(pressPosition[0], pressPosition[1])
-        intersected = targetSurfaceLoopIntersect(self.targetList, worldPos, worldDir)
+        worldPos, worldDir = self.view.getViewportClick(pressPosition[0], pressPosition[1])
+        intersected = targetSurfaceLoopIntersect(self.targetList, worldPos, worldDir, self.view.getFarClip(), self.getLocality())
+
+        # the drag path starts at the press hit (if any)
+        self.path.reset()
 
         if intersected:
             # usable intersection found
-            intersected.convertUnit(self.unit)
+            intersected.convertUnit(self.unit, self.view.unitFactor)
             intersected.isValid(True)
             if sp3d_dbg:
                 logDebugInfo('found intersected')
@@ -899,45 +2449,30 @@ class paintContext(object):
             if not self.uiValues.paintFlux:
                 # paintFlux set on timer
                 intersected.startTimer()
+            self.path.reset(pressPosition, intersected.hitPoint)
 
-            # choose source
-            if self.uiValues.random:
-                useWeights = len(self.uiValues.sourceWeights) > 0
-                intersected.dagMeshSourceObject = self.sourceList.getRandom(weighted=useWeights, sourceWeights=self.uiValues.sourceWeights)
-            else:
-                intersected.dagMeshSourceObject = self.sourceList.getNext()
-            if sp3d_dbg:
-                logDebugInfo('got the dag for the source object to use')
-
-            # create object
+            # create object (or queue it when the creation is deferred)
             if sp3d_dbg:
                 logDebugInfo('creating object from the dag')
-            intersected.createdObjectDAG(self.createObject(intersected))
-            intersected.setInitialScale()
+            self.addPlacement(intersected)
+            if not self.uiValues.deferredCreation or self.placements.isDue():
+                self.flushPlacements()
             if sp3d_dbg:
                 logDebugInfo('finished creating object from the dag, appending to intersection list')
-            self.strokeIntersectionList.addPoint(intersected)
-
-            # optional jitter
-            if self.uiValues.jitter:
-                if self.uiValues.jitterAlgorithm == 1:  # Re-raycast
-                    applyJitterWithReRaycast(intersected, self.uiValues, self.transform, self.targetList, self.worldUp)
-                else:  # Simple (default)
-                    u = self.transform.getRandomJitter('uJitter')
-                    v = self.transform.getRandomJitter('vJitter')
-                    yOffset = math.fabs(self.worldUp.y - 1) * v
-                    zOffset = math.fabs(self.worldUp.z - 1) * v
-                    mc.move(u, yOffset, zOffset, intersected.generatedDAG, relative=True)
 
         if sp3d_dbg:
             logDebugInfo('finished paintContext onPress')
-        forceRefresh()
+        # viewport redraw (coalesced, skipped while placements wait for their object)
+        self.refresh.request(pending=bool(self.placements.pending))
 
     def onDrag(self):
         '''
         on mouse drag event
         '''
-        #print("onDrag: hierarchy =", self.uiValues.hierarchy)
+        # recording the drag sample first: a drag event dropped by the reentrance guard is processed with the next one
+        dragPosition = mc.draggerContext(spPaint3dContextID, query=True, dragPoint=True)
+        self.path.addSample(dragPosition[0], dragPosition[1])
+
         # reentrance guard
         if self.reentrance == 0:
             self.reentrance = 1
@@ -954,98 +2489,145 @@ class paintContext(object):
             else:
                 self.tempgroup = spPaint3dTempGroupID
 
-        dragPosition = mc.draggerContext(spPaint3dContextID, query=True, dragPoint=True)
-        worldPos, worldDir = getViewportClick(dragPosition[0], dragPosition[1])
-        intersected = targetSurfaceLoopIntersect(self.targetList, worldPos, worldDir)
-
-        if intersected:
-            # check coherence with paintFlux settings
-            intersected.convertUnit(self.unit)
+        if self.uiValues.paintFlux:
+            # distance-based placement: objects every paintDistance along the drag path
+            for intersected in self.resamplePath():
+                self.addPlacement(intersected)
+        else:
+            # timer-based placement: only the last drag point matters
+            dragPosition = self.path.take()[-1]
+            worldPos, worldDir = self.view.getViewportClick(dragPosition[0], dragPosition[1])
+            intersected = targetSurfaceLoopIntersect(self.targetList, worldPos, worldDir, self.view.getFarClip(), self.getLocality())
 
-            if len(self.strokeIntersectionList.intersectionList) == 0:
-                # no intersection during onPress
+            if intersected:
+                intersected.convertUnit(self.unit, self.view.unitFactor)
                 if sp3d_log:
                     print('intersection at X: %f | Y: %f | Z: %f' % (
                         intersected.hitPoint.x, intersected.hitPoint.y, intersected.hitPoint.z))
-                if not self.uiValues.paintFlux:
+
+                if self.strokeBuffer.getLength() == 0:
+                    # no intersection during onPress
                     intersected.startTimer()
-            else:
-                # there was a previous intersection
-                if self.uiValues.paintFlux:
-                    # distance-based placement
-                    distanceToPrevious = getDistanceBetween(
-                        self.strokeIntersectionList.intersectionList[-1].hitPoint,
-                        intersected.hitPoint
-                    )
-                    correctedPaintDistance = self.uiValues.paintDistance
-                    if sp3d_log:
-                        print('intersection at X: %f | Y: %f | Z: %f |||| distance from previous: %f '
-                              '(x: %f | y: %f | z: %f)(threshold: %f)(length of list: %i)' % (
-                                  intersected.hitPoint.x, intersected.hitPoint.y, intersected.hitPoint.z,
-                                  distanceToPrevious,
-                                  self.strokeIntersectionList.intersectionList[-1].hitPoint.x,
-                                  self.strokeIntersectionList.intersectionList[-1].hitPoint.y,
-                                  self.strokeIntersectionList.intersectionList[-1].hitPoint.z,
-                                  correctedPaintDistance,
-                                  len(self.strokeIntersectionList.intersectionList)))
-                    if distanceToPrevious < correctedPaintDistance:
-                        intersected.isValid(False)
-                    else:
-                        intersected.isValid(True)
+                elif mc.timerX(startTime=self.strokeBuffer.timestamp) < self.uiValues.paintTimer:
+                    intersected.isValid(False)
                 else:
-                    # timer-based placement
-                    if mc.timerX(startTime=self.strokeIntersectionList.intersectionList[-1].timestamp) < self.uiValues.paintTimer:
-                        intersected.isValid(False)
-                    else:
-                        intersected.isValid(True)
-                        intersected.startTimer()
-
-            if intersected.isValid():
-                if sp3d_log:
-                    print("valid intersection, creating object")
+                    intersected.isValid(True)
+                    intersected.startTimer()
 
-                # choose source
-                if self.uiValues.random:
-                    useWeights = len(self.uiValues.sourceWeights) > 0
-                    intersected.updateDAGSourceObject(self.sourceList.getRandom(weighted=useWeights, sourceWeights=self.uiValues.sourceWeights))
-                else:
-                    intersected.updateDAGSourceObject(self.sourceList.getNext())
-
-                # optional jitter BEFORE object creation
-                if self.uiValues.jitter:
-                    if self.uiValues.jitterAlgorithm == 1:  # Re-raycast
-                        applyJitterWithReRaycast(intersected, self.uiValues, self.transform, self.targetList, self.worldUp)
-                    # For simple jitter, we'll do it after object creation as before
-                
-                # create object
-                intersected.createdObjectDAG(self.createObject(intersected))
-                intersected.setInitialScale()
-                self.strokeIntersectionList.addPoint(intersected)
-
-                # simple jitter after object creation (if not re-raycast)
-                if self.uiValues.jitter and self.uiValues.jitterAlgorithm != 1:
-                    u = self.transform.getRandomJitter('uJitter')
-                    v = self.transform.getRandomJitter('vJitter')
-                    yOffset = math.fabs(self.worldUp.y - 1) * v
-                    zOffset = math.fabs(self.worldUp.z - 1) * v
-                    mc.move(u, yOffset, zOffset, intersected.generatedDAG, relative=True)
-
-                # real-time rampFX
-                if self.uiValues.realTimeRampFX:
-                    self.rampFX(self.strokeIntersectionList)
+                if intersected.isValid():
+                    self.addPlacement(intersected)
+
+        # deferred creation flushes every sp3dFlushSize placements or after sp3dFlushDelay seconds, checked at every drag event (see onHold when the mouse stops)
+        if not self.uiValues.deferredCreation or self.placements.isDue():
+            self.flushPlacements()
+
+        # real-time rampFX, throttled and limited to the placements whose ramp value moved (see rampEngine)
+        if self.uiValues.realTimeRampFX:
+            self.rampFX(self.strokeBuffer)
 
         if sp3d_dbg:
             logDebugInfo('finished paintContext onDrag')
-        forceRefresh()
+        self.refresh.request(pending=bool(self.placements.pending))
+        self.reentrance = 0
+
+    def onHold(self):
+        '''
+        on mouse hold event (button down, mouse not moving): the queued placements are created without waiting for the next drag event
+        '''
+        if self.reentrance == 1 or not self.placements.pending: return
+        self.reentrance = 1
+        self.flushPlacements()
+        if self.uiValues.realTimeRampFX:
+            self.rampFX(self.strokeBuffer)
+        self.refresh.request()
         self.reentrance = 0
 
-    def rampFX(self, objectList):
+    def addPlacement(self, intersected):
+        '''
+        choose the source of the valid intersected placement, apply the re-raycast jitter and add it to the stroke buffer and the creation queue
+        '''
+        if sp3d_log:
+            print("valid intersection, creating object")
+
+        # choose source
+        if self.uiValues.random:
+            useWeights = len(self.uiValues.sourceWeights) > 0
+            intersected.updateDAGSourceObject(self.sourceList.getRandom(weighted=useWeights, sourceWeights=self.uiValues.sourceWeights, stream=self.transform.random))
+        else:
+            intersected.updateDAGSourceObject(self.sourceList.getNext())
+
+        # optional re-raycast jitter BEFORE object creation (simple jitter is applied at creation)
+        if self.uiValues.jitter and self.uiValues.jitterAlgorithm == 1:
+            applyJitterWithReRaycast(intersected, self.uiValues, self.transform, self.targetList, self.worldUp, self.view.getFarClip())
+
+        # create object (or queue it when the creation is deferred)
+        self.strokeBuffer.addPoint(intersected)
+        self.placements.add(intersected)
+
+    def resamplePath(self):
+        '''
+        cast the drag samples recorded since the last call and walk the path they draw on the target surfaces
+        return the valid intersectionPoint objects found every paintDistance along the path
+        rays are only cast for the samples and the placements between two samples, a placement landing on a sample reuses its hit
+        '''
+        samples = self.path.take()
+        if not samples:
+            return []
+
+        worldPositions, worldDirections = self.view.getViewportClicks(samples)
+        batch = targetSurfaceBatchIntersect(self.targetList, worldPositions, worldDirections, self.view.getFarClip(), self.getLocality())
+        batch.convertUnit(self.view.unitFactor)
+        hitIndices = [index for index in range(batch.count) if batch.isHit(index)]
+        hits = [(samples[index], batch.points[index]) for index in hitIndices]
+
+        if self.uiValues.paintDistance <= 0:
+            # no spacing: an object at every drag sample hit
+            placements = []
+            for index in range(batch.count):
+                intersected = batch.getIntersectionPoint(index)
+                if intersected:
+                    intersected.isValid(True)
+                    placements.append(intersected)
+            if hits: self.path.last = hits[-1]
+            return placements
+
+        resampled = self.path.resample(hits, self.uiValues.paintDistance)
+        if sp3d_log:
+            print('%i drag samples (%i hits) resampled into %i placements (spacing: %f)' % (len(samples), len(hits), len(resampled), self.uiValues.paintDistance))
+        if not resampled:
+            return []
+
+        # only the placements between two samples need a new ray
+        screenPoints = [screenPoint for screenPoint, hitNumber in resampled if hitNumber < 0]
+        castBatch = None
+        if screenPoints:
+            worldPositions, worldDirections = self.view.getViewportClicks(screenPoints)
+            castBatch = targetSurfaceBatchIntersect(self.targetList, worldPositions, worldDirections, self.view.getFarClip(), self.getLocality())
+
+        placements = []
+        castIndex = 0
+        for screenPoint, hitNumber in resampled:
+            if hitNumber >= 0:
+                # the sample hit, already converted with its batch
+                intersected = batch.getIntersectionPoint(hitIndices[hitNumber])
+            else:
+                intersected = castBatch.getIntersectionPoint(castIndex)
+                castIndex += 1
+                if intersected:
+                    intersected.convertUnit(self.unit, self.view.unitFactor)
+            if intersected:
+                intersected.isValid(True)
+                placements.append(intersected)
+        return placements
+
+    def rampFX(self, buffer, final=False):
         '''
-        operates the ramp FX on the passed intersectionList
+        operates the ramp FX on the passed strokeBuffer
+        the ramp values are absolute: scale from the initial scale and rotation composed in object space with the rotation at creation
+        while dragging (final False) the application is throttled and only the placements whose ramp ratio moved enough are updated (see rampEngine)
         '''
         if self.uiValues.rampFX:
-            nbObj = objectList.getLength()
-            currentObj = 0.0
+            nbObj = buffer.getLength()
             scaleX, scaleY, scaleZ = self.transform.scale
             rotateX, rotateY, rotateZ = self.transform.rotate
 
@@ -1057,51 +2639,85 @@ class paintContext(object):
             rotateAmplitudeY = rotateY[1] - rotateY[0]
             rotateAmplitudeZ = rotateZ[1] - rotateZ[0]
 
-            for obj in objectList.intersectionList:
-                currentObj += 1.0  # ensure float division
+            # instancer output mode: the ramp values are stored and written to the stroke particles once at stroke end (see pointInstancer.flush)
+            particleIds, particleRotations, particleScales = [], [], []
+
+            for index, ratio in self.ramp.getUpdates(nbObj, final):
+                generatedDAG = buffer.generatedDAGs[index]
+                particleId = buffer.particleIds[index]
+                if not generatedDAG and particleId < 0:
+                    # placement still queued or creation failed
+                    self.ramp.applied[index] = -1.0
+                    continue
+
+                initialScale = buffer.initialScales[3*index:3*index+3]
+                scale = None
+                rotation = None
 
                 if self.uiValues.rampFX != 1:
-                    currentObjScaleX = scaleX[0] + scaleAmplitudeX * (currentObj / nbObj)
+                    currentObjScaleX = scaleX[0] + scaleAmplitudeX * ratio
                     currentObjScaleY = currentObjScaleZ = currentObjScaleX
                     if not self.uiValues.transformScaleUniform:
-                        currentObjScaleY = scaleY[0] + scaleAmplitudeY * (currentObj / nbObj)
-                        currentObjScaleZ = scaleZ[0] + scaleAmplitudeZ * (currentObj / nbObj)
-                    mc.scale(
-                        currentObjScaleX * obj.initialScale[0],
-                        currentObjScaleY * obj.initialScale[1],
-                        currentObjScaleZ * obj.initialScale[2],
-                        obj.generatedDAG,
-                        relative=False
-                    )
+                        currentObjScaleY = scaleY[0] + scaleAmplitudeY * ratio
+                        currentObjScaleZ = scaleZ[0] + scaleAmplitudeZ * ratio
+                    scale = (currentObjScaleX * initialScale[0], currentObjScaleY * initialScale[1], currentObjScaleZ * initialScale[2])
                     if sp3d_ramp:
                         print("rampFX (Scale) obj# %i / %i (percent: %f) %s -> X %f Y %f Z %f" % (
-                            currentObj, nbObj, (currentObj / nbObj), obj.generatedDAG,
+                            index + 1, nbObj, ratio, generatedDAG,
                             currentObjScaleX, currentObjScaleY, currentObjScaleZ))
 
                 if self.uiValues.rampFX != 2:
-                    currentObjRotateX = rotateX[0] + rotateAmplitudeX * (currentObj / nbObj)
-                    currentObjRotateY = rotateY[0] + rotateAmplitudeY * (currentObj / nbObj)
-                    currentObjRotateZ = rotateZ[0] + rotateAmplitudeZ * (currentObj / nbObj)
-                    # Use object-space rotation to preserve surface alignment
-                    mc.rotate(currentObjRotateX, currentObjRotateY, currentObjRotateZ, obj.generatedDAG, os=True, r=True, rotateXYZ=True)
+                    rampRotation = (rotateX[0] + rotateAmplitudeX * ratio, rotateY[0] + rotateAmplitudeY * ratio, rotateZ[0] + rotateAmplitudeZ * ratio)
+                    # object space rotation on top of the rotation at creation, preserving surface alignment without compounding
+                    rotateOrder = buffer.rotateOrders[index]
+                    baseRotation = [math.radians(angle) for angle in buffer.rotations[3*index:3*index+3]]
+                    rotation = composeRotation(rampRotation, om.MEulerRotation(baseRotation[0], baseRotation[1], baseRotation[2], rotateOrder)).reorder(rotateOrder)
+                    rotation = (math.degrees(rotation.x), math.degrees(rotation.y), math.degrees(rotation.z))
+
+                if particleId >= 0:
+                    particleIds.append(particleId)
+                    particleRotations.append(rotation or tuple(buffer.rotations[3*index:3*index+3]))
+                    particleScales.append(scale or tuple(initialScale))
+                elif scale and rotation:
+                    mc.xform(generatedDAG, scale=scale, rotation=rotation)
+                elif scale:
+                    mc.xform(generatedDAG, scale=scale)
+                else:
+                    mc.xform(generatedDAG, rotation=rotation)
+
+            if particleIds:
+                sp3dPointInstancer.setValues(particleIds, particleRotations, particleScales)
 
     def onRelease(self):
         '''
         on mouse release event: CLEANUP & rampFX if needed
         '''
-        if not self.uiValues.realTimeRampFX:
-            self.rampFX(self.strokeIntersectionList)
+        # stroke end: no need to track the camera anymore
+        self.view.release()
 
-        if self.uiValues.hierarchy:
+        # drag samples left by a dropped drag event
+        if self.uiValues.paintFlux:
+            for intersected in self.resamplePath():
+                self.addPlacement(intersected)
+
+        # creating the objects still queued, then applying the exact ramp values
+        self.flushPlacements()
+        self.rampFX(self.strokeBuffer, final=True)
+        sp3dPointInstancer.flush()
+
+        # instancer output mode: the placements are particles, there is no transform to group
+        if self.uiValues.hierarchy and not self.uiValues.instancer:
             # grouping objects
             g = int(self.uiValues.group)
             if g == 0:
                 groupName = self.uiValues.getGroupID()
-                for obj in self.strokeIntersectionList.intersectionList:
+                for generatedDAG in self.strokeBuffer.generatedDAGs:
+                    if not generatedDAG:
+                        continue
                     if not mc.objExists(groupName):
                         groupName = mc.group(empty=True, name=groupName)
                     # Always use long names for parenting
-                    child = mc.ls(obj.generatedDAG, long=True)[0]
+                    child = mc.ls(generatedDAG, long=True)[0]
                     parent = mc.ls(groupName, long=True)[0]
                     # Only parent if not already parented
                     parents = mc.listRelatives(child, parent=True, fullPath=True) or []
@@ -1111,19 +2727,24 @@ class paintContext(object):
             elif g == 1:
                 groupName = mc.group(empty=True, name='spPaint3dStrokeOutput')
                 parent = mc.ls(groupName, long=True)[0]
-                for obj in self.strokeIntersectionList.intersectionList:
-                    child = mc.ls(obj.generatedDAG, long=True)[0]
+                for generatedDAG in self.strokeBuffer.generatedDAGs:
+                    if not generatedDAG:
+                        continue
+                    child = mc.ls(generatedDAG, long=True)[0]
                     parents = mc.listRelatives(child, parent=True, fullPath=True) or []
                     if not parents or parents[0] != parent:
                         mc.parent(child, parent, relative=True)
 
             elif g == 2:
-                for obj in self.strokeIntersectionList.intersectionList:
-                    shapeParent = mc.listRelatives(obj.dagMeshSourceObject, parent=True, fullPath=True)
-                    groupName = 'spPaint3dOutput_' + (shapeParent[0] if shapeParent else obj.dagMeshSourceObject)
+                for index, generatedDAG in enumerate(self.strokeBuffer.generatedDAGs):
+                    if not generatedDAG:
+                        continue
+                    sourceDAG = self.strokeBuffer.getSource(index)
+                    shapeParent = mc.listRelatives(sourceDAG, parent=True, fullPath=True)
+                    groupName = 'spPaint3dOutput_' + (shapeParent[0] if shapeParent else sourceDAG)
                     if not mc.objExists(groupName):
                         groupName = mc.group(name=groupName, empty=True)
-                    child = mc.ls(obj.generatedDAG, long=True)[0]
+                    child = mc.ls(generatedDAG, long=True)[0]
                     parent = mc.ls(groupName, long=True)[0]
                     parents = mc.listRelatives(child, parent=True, fullPath=True) or []
                     if not parents or parents[0] != parent:
@@ -1138,101 +2759,140 @@ class paintContext(object):
                     print("tempGroup (%s) is empty, removing." % self.tempgroup)
                 mc.delete(self.tempgroup)
 
-    def createObject(self, intersection):
-        '''
-        will create the object at the intersection object gathered data, pending all ui and transform options
-        will update the stored data to store the created object DAG path and return the newly created object DAG Path back
-        '''
-        # Determine the source object to duplicate/instance
-        sourceDAG = intersection.dagMeshSourceObject
-        
-        # Check if sourceDAG is already a transform or if we need to get its parent
-        if mc.nodeType(sourceDAG) == 'transform':
-            # Already a transform (could be a group or object transform)
-            targetToClone = sourceDAG
-        else:
-            # It's a shape, get its parent transform
-            tempDAG = mc.listRelatives(sourceDAG, parent=True)
-            if not tempDAG:
-                print("Error: No parent transform found for shape: %s" % sourceDAG)
-                return None
-            targetToClone = tempDAG[0]
-        
-        # instance or duplicate
-        if self.uiValues.instance:
-            if sp3d_dbg:
-                logDebugInfo('creating instance')
-            newObjectDAG = mc.instance(targetToClone)
-        else:
-            if sp3d_dbg:
-                logDebugInfo('duplicating object')
-            newObjectDAG = mc.duplicate(targetToClone, ic=self.uiValues.preserveConn)
-
-        if sp3d_dbg:
-            logDebugInfo('DONE creating instance / duplicating object')
-
-        # Always convert to long names (namespace-safe)
-        newObjectDAG = [mc.ls(obj, long=True)[0] for obj in newObjectDAG]
-
-        # When duplicating groups, Maya returns [group, child1, child2, ...] 
-        # We only need the top-level group/object
-        if len(newObjectDAG) > 1:
-            if mc.nodeType(newObjectDAG[0]) == 'transform':
-                newObjectDAG = [newObjectDAG[0]]
-            else:
-                topLevelNodes = []
-                fullPaths = [mc.ls(dag, long=True)[0] for dag in newObjectDAG]
-                for i, dag in enumerate(fullPaths):
-                    parents = mc.listRelatives(dag, parent=True, fullPath=True) or []
-                    isTopLevel = True
-                    for parent in parents:
-                        if parent in fullPaths:
-                            isTopLevel = False
-                            break
-                    if isTopLevel:
-                        topLevelNodes.append(newObjectDAG[i])
-                if len(topLevelNodes) == 1:
-                    newObjectDAG = topLevelNodes
-                elif len(topLevelNodes) > 1:
-                    print("Warning: Multiple top-level objects created, using first: %s" % topLevelNodes[0])
-                    newObjectDAG = [topLevelNodes[0]]
-                else:
-                    print("Warning: No top-level objects found, using original first: %s" % newObjectDAG[0])
-                    newObjectDAG = [newObjectDAG[0]]
-
-        # move to hit point
-        moveTo(newObjectDAG[0], intersection.hitPoint)
+        # final redraw of the stroke
+        self.refresh.release()
+
+    def flushPlacements(self):
+        '''
+        create the objects (or the point instancer particles) of all the queued placements within a single undo chunk
+        return the number of placements flushed
+        '''
+        pending = self.placements.take()
+        if not pending: return 0
+        # every placement of the stroke is queued, the pending ones are the last of the stroke buffer
+        first = self.strokeBuffer.getLength() - len(pending)
+
+        mc.undoInfo(openChunk=True, chunkName='spPaint3dPlacements')
+        try:
+            if self.uiValues.instancer:
+                # instancer output mode: one particle per placement, no transform node
+                sources = []
+                for intersected in pending:
+                    intersected.placement = self.getPlacementTransform(intersected)
+                    prototype = sp3dSourceCache.get(intersected.dagMeshSourceObject)
+                    sources.append(prototype.transformDAG if prototype else None)
+                valid = [(intersected, source) for intersected, source in zip(pending, sources) if source]
+                particleIds = sp3dPointInstancer.append([source for intersected, source in valid], [intersected.placement for intersected, source in valid])
+                for (intersected, source), particleId in zip(valid, particleIds):
+                    intersected.particleId = particleId
+                for index, intersected in enumerate(pending):
+                    self.strokeBuffer.setCreated(first + index, intersected)
+                return len(pending)
+
+            # createObjects stores the created objects and their initial scale on the intersections, simple jitter included
+            self.createObjects(pending)
+
+            for index, intersected in enumerate(pending):
+                self.strokeBuffer.setCreated(first + index, intersected)
+        finally:
+            mc.undoInfo(closeChunk=True)
+        return len(pending)
+
+    def getPlacementTransform(self, intersection, baseRotation=None, rotateOrder=om.MEulerRotation.kXYZ):
+        '''
+        return the (position (MVector), rotation (x,y,z degrees), scale (x,y,z)) of the object to place at the intersection, pending all ui and transform options, simple jitter included
+        baseRotation (MEulerRotation) is the rotation kept when the object isn't aligned to the surface, no rotation if None
+        the rotation is returned in rotateOrder, the rotate order of the object it is set on
+        '''
+        position = om.MVector(intersection.hitPoint.x, intersection.hitPoint.y, intersection.hitPoint.z)
+        rotation = baseRotation if baseRotation is not None else om.MEulerRotation()
+        scale = (1.0, 1.0, 1.0)
 
         # align to surface normal
         if self.uiValues.align:
-            if sp3d_dbg:
-                logDebugInfo('aligning object with surface normal')
-            rx, ry, rz = getEulerRotationQuaternion(self.worldUp, intersection.getHitNormal(self.uiValues.smoothNormal))
-            mc.xform(newObjectDAG[0], ro=(rx, ry, rz))
-            if sp3d_dbg:
-                logDebugInfo('DONE aligning object with surface normal')
+            intersection.hitNormal = intersection.getHitNormal(self.uiValues.smoothNormal)
+            rx, ry, rz = getEulerRotationQuaternion(self.worldUp, intersection.hitNormal)
+            rotation = om.MEulerRotation(math.radians(rx), math.radians(ry), math.radians(rz))
 
         # random rotate / scale (skipped if rampFX drives them)
         if self.uiValues.transformRotate and not self.uiValues.rampFX:
-            randrotate = self.transform.getRandomRotate(self.uiValues)
-            mc.rotate(randrotate[0], randrotate[1], randrotate[2], newObjectDAG[0], os=True, r=True, rotateXYZ=True)
+            rotation = composeRotation(self.transform.getRandomRotate(self.uiValues), rotation)
 
         if self.uiValues.transformScale and not self.uiValues.rampFX:
-            randscale = self.transform.getRandomScale(self.uiValues.transformScaleUniform)
-            mc.scale(randscale[0], randscale[1], randscale[2], newObjectDAG[0], relative=True)
+            scale = self.transform.getRandomScale(self.uiValues.transformScaleUniform)
 
         # up offset
         if self.uiValues.upOffset != 0:
-            offsetArray = [
-                self.uiValues.upOffset * self.worldUp.x,
-                self.uiValues.upOffset * self.worldUp.y,
-                self.uiValues.upOffset * self.worldUp.z
-            ]
-            mc.move(offsetArray[0], offsetArray[1], offsetArray[2], newObjectDAG[0], relative=True)
-
-        # ensure created object is visible if forceVisibility option is enabled
+            position += om.MVector(self.worldUp.x, self.worldUp.y, self.worldUp.z) * self.uiValues.upOffset
+
+        # simple jitter (if not re-raycast)
+        if self.uiValues.jitter and self.uiValues.jitterAlgorithm != 1:
+            u = self.transform.getRandomJitter('uJitter')
+            v = self.transform.getRandomJitter('vJitter')
+            position += om.MVector(u, math.fabs(self.worldUp.y - 1) * v, math.fabs(self.worldUp.z - 1) * v)
+
+        rotation = rotation.reorder(rotateOrder)
+        return position, (math.degrees(rotation.x), math.degrees(rotation.y), math.degrees(rotation.z)), scale
+
+    def createObjects(self, intersections):
+        '''
+        will create an object at every intersection object gathered data, pending all ui and transform options
+        the source lookups, visibility and tempgroup parenting are shared by all the intersections
+        the transform of each object is composed in python (see getPlacementTransform) from the cached source data (see sourcePrototype) and set with a single xform call
+        the created object and its initial scale are stored on the intersections
+        return the list of the created objects DAG paths (None where the creation failed)
+        '''
+        prototypes = {} #source DAG -> its sourcePrototype (transform to duplicate/instance, pivot offset, rotation, scale), fetched once per batch
+        created = []
+        for intersection in intersections:
+            # Determine the source object to duplicate/instance
+            sourceDAG = intersection.dagMeshSourceObject
+            if sourceDAG not in prototypes:
+                prototypes[sourceDAG] = sp3dSourceCache.get(sourceDAG)
+            prototype = prototypes[sourceDAG]
+            if not prototype:
+                print("Error: No transform found for source: %s" % sourceDAG)
+                created.append(None)
+                continue
+            targetToClone = prototype.transformDAG
+
+            # instance or duplicate
+            if self.uiValues.instance:
+                if sp3d_dbg:
+                    logDebugInfo('creating instance')
+                newObjectDAG = mc.instance(targetToClone)
+            else:
+                if sp3d_dbg:
+                    logDebugInfo('duplicating object')
+                newObjectDAG = mc.duplicate(targetToClone, ic=self.uiValues.preserveConn)
+
+            if sp3d_dbg:
+                logDebugInfo('DONE creating instance / duplicating object')
+
+            newObject = getTopLevelNode(newObjectDAG)
+
+            # the duplicate keeps the source transform: pivot offset (unfrozen transforms, see moveTo), rotation (when not aligned) and scale
+            pivotOffset, sourceRotation, sourceScale = prototype.getTransform()
+            # the duplicate has the rotate order of the source, the rotation values are expressed in it
+            position, rotation, scale = self.getPlacementTransform(intersection, sourceRotation, prototype.rotateOrder)
+            position += pivotOffset
+            scale = [sourceScale[axis] * scale[axis] for axis in range(3)]
+
+            # hit point, alignment, random rotate / scale, up offset and simple jitter in a single command
+            mc.xform(newObject, translation=(position.x, position.y, position.z), rotation=rotation, scale=scale)
+            intersection.initialScale = scale
+            intersection.placement = (position, rotation, scale)
+            intersection.rotateOrder = prototype.rotateOrder
+
+            created.append(newObject)
+
+        newObjects = [newObject for newObject in created if newObject]
+        if not newObjects: return created
+
+        # ensure created objects are visible if forceVisibility option is enabled
         if self.uiValues.forceVisibility:
-            mc.setAttr(newObjectDAG[0] + '.visibility', 1)
+            for newObject in newObjects:
+                mc.setAttr(newObject + '.visibility', 1)
 
         # tempgroup parenting only when hierarchy is enabled
         if self.uiValues.hierarchy:
@@ -1241,13 +2901,16 @@ class paintContext(object):
                 self.tempgroup = mc.group(empty=True, name=spPaint3dTempGroupID)
                 if sp3d_log:
                     print("Created tempgroup: %s" % self.tempgroup)
-            
-            # Parent to tempgroup
-            grouped = mc.parent(newObjectDAG[0], self.tempgroup, relative=True)
-            return grouped[0]
 
-        # fallback: return original transform (no hierarchy grouping)
-        return newObjectDAG[0]
+            # Parent the whole batch to tempgroup at once
+            grouped = iter(mc.parent(newObjects, self.tempgroup, relative=True))
+            created = [next(grouped) if newObject else None for newObject in created]
+
+        for intersection, newObject in zip(intersections, created):
+            if newObject: intersection.createdObjectDAG(newObject)
+
+        # fallback: return original transforms (no hierarchy grouping)
+        return created
 
     def runtimeUpdate(self, uioptions, transformoptions, sourcelist, targetlist):
         '''
@@ -1258,6 +2921,13 @@ class paintContext(object):
         self.sourceList = sourcelist
         self.targetList = targetlist
 
+    def getLocality(self):
+        '''
+        return the strokeLocality used to cast the stroke rays, None when the stroke-local raycast option is off
+        '''
+        if (self.uiValues.localRaycast): return self.locality
+        return None
+
 
 
 
@@ -1272,20 +2942,110 @@ def forceRefresh():
     mc.refresh(cv=True)
 
 
-def moveTo(dag, pos, rot=None):
+def getCloneTarget(sourceDAG):
+    '''
+    return the transform to duplicate/instance for the sourceDAG source object (itself if it's a transform, its parent if it's a shape)
+    return None if a shape doesn't have any parent transform
+    '''
+    # Check if sourceDAG is already a transform or if we need to get its parent
+    if mc.nodeType(sourceDAG) == 'transform':
+        # Already a transform (could be a group or object transform)
+        return sourceDAG
+
+    # It's a shape, get its parent transform
+    tempDAG = mc.listRelatives(sourceDAG, parent=True)
+    if not tempDAG:
+        print("Error: No parent transform found for shape: %s" % sourceDAG)
+        return None
+    return tempDAG[0]
+
+
+def getTopLevelNode(newObjectDAG):
+    '''
+    return the long name of the top-level node among the nodes returned by a duplicate/instance command
+    '''
+    # Always convert to long names (namespace-safe)
+    newObjectDAG = [mc.ls(obj, long=True)[0] for obj in newObjectDAG]
+
+    # When duplicating groups, Maya returns [group, child1, child2, ...] 
+    # We only need the top-level group/object
+    if len(newObjectDAG) > 1:
+        if mc.nodeType(newObjectDAG[0]) == 'transform':
+            newObjectDAG = [newObjectDAG[0]]
+        else:
+            topLevelNodes = []
+            fullPaths = [mc.ls(dag, long=True)[0] for dag in newObjectDAG]
+            for i, dag in enumerate(fullPaths):
+                parents = mc.listRelatives(dag, parent=True, fullPath=True) or []
+                isTopLevel = True
+                for parent in parents:
+                    if parent in fullPaths:
+                        isTopLevel = False
+                        break
+                if isTopLevel:
+                    topLevelNodes.append(newObjectDAG[i])
+            if len(topLevelNodes) == 1:
+                newObjectDAG = topLevelNodes
+            elif len(topLevelNodes) > 1:
+                print("Warning: Multiple top-level objects created, using first: %s" % topLevelNodes[0])
+                newObjectDAG = [topLevelNodes[0]]
+            else:
+                print("Warning: No top-level objects found, using original first: %s" % newObjectDAG[0])
+                newObjectDAG = [newObjectDAG[0]]
+
+    return newObjectDAG[0]
+
+
+def createProxyCursor(prototype):
+    '''
+    create a box curve with the object space bounding box, pivots, rotation and scale of the prototype source
+    used as a lightweight place mode cursor, it moves, rotates and scales like a duplicate of the source would
+    return the curve transform long name
+    '''
+    (x0, y0, z0), (x1, y1, z1) = prototype.localBoxMin, prototype.localBoxMax
+    corners = [(x0,y0,z0), (x1,y0,z0), (x1,y0,z1), (x0,y0,z1), (x0,y1,z0), (x1,y1,z0), (x1,y1,z1), (x0,y1,z1)]
+    #single linear curve going through the 12 edges of the box
+    proxy = mc.curve(degree=1, point=[corners[i] for i in (0,1,2,3,0,4,5,1,5,6,2,6,7,3,7,4)], name=spPaint3dProxyCursorID)
+
+    sourceParent = mc.listRelatives(prototype.transformDAG, parent=True, fullPath=True)
+    if (sourceParent): proxy = mc.parent(proxy, sourceParent[0], relative=True)[0]
+    proxy = mc.ls(proxy, long=True)[0]
+
+    rotation = prototype.rotation
+    #same rotate order as the source, so realize() can copy the rotation values to the new object
+    mc.setAttr(proxy+'.rotateOrder', prototype.rotateOrder)
+    mc.xform(proxy, objectSpace=True, scalePivot=prototype.scalePivot, rotatePivot=prototype.rotatePivot)
+    mc.xform(proxy, rotation=(math.degrees(rotation.x), math.degrees(rotation.y), math.degrees(rotation.z)), scale=prototype.scale)
+    mc.setAttr(proxy+'.overrideEnabled', 1)
+    mc.setAttr(proxy+'.overrideColor', 17)
+    return proxy
+
+
+def moveTo(dag, pos, rot=None, pivotOffset=None):
     '''
     move the dag object to pos position
-    attemps to compensate for unfrozen transform by reading the scalepivot of the object
+    attemps to compensate for unfrozen transform by reading the scalepivot of the object, unless the pivotOffset (MVector) is already known (see sourcePrototype)
     '''
-    scalePivot = mc.xform(dag, query=True, ws=True, sp=True)
-    transform = mc.xform(dag, query=True, ws=True, t=True)
+    if (pivotOffset is None):
+        scalePivot = mc.xform(dag, query=True, ws=True, sp=True)
+        transform = mc.xform(dag, query=True, ws=True, t=True)
+        pivotOffset = om.MVector(transform[0]-scalePivot[0], transform[1]-scalePivot[1], transform[2]-scalePivot[2])
 
-    mc.xform(dag, t=( (transform[0]-scalePivot[0])+pos.x, (transform[1]-scalePivot[1])+pos.y, (transform[2]-scalePivot[2])+pos.z ))
+    mc.xform(dag, t=( pivotOffset.x+pos.x, pivotOffset.y+pos.y, pivotOffset.z+pos.z ))
     if (rot):
         if sp3d_log: print (rot)
         mc.rotate(rot[0], rot[1], rot[2], dag, os=True, r=True, rotateXYZ=True)
 
 
+def composeRotation(localRotation, rotation):
+    '''
+    return the MEulerRotation of the localRotation (x,y,z degrees) applied in object space on top of the rotation (MEulerRotation)
+    same result as a relative object space mc.rotate on an object rotated by rotation
+    '''
+    local = om.MEulerRotation(math.radians(localRotation[0]), math.radians(localRotation[1]), math.radians(localRotation[2]))
+    return om.MTransformationMatrix(local.asMatrix() * rotation.asMatrix()).rotation()
+
+
 def getPosition(dag):
     '''
     retrieve the world position of the dag parameter object and return a point object containing the position
@@ -1308,23 +3068,19 @@ def getEulerRotationQuaternion(upvector, directionvector):
     input: upvector (MVector) & directionvector (MVector)
     '''
     quat = om.MQuaternion(upvector, directionvector)
-    quatAsEuler = om.MEulerRotation()
     quatAsEuler = quat.asEulerRotation()
 
     return math.degrees(quatAsEuler.x), math.degrees(quatAsEuler.y), math.degrees(quatAsEuler.z)
 
 
-def getViewportClick(screenX, screenY):
+def getViewportClick(screenX, screenY, activeView=None):
     '''
     return world position and direction of the viewport clicked point (returns point objects)
+    optional activeView (M3dView) to avoid querying the active view again (see strokeView)
     '''
-    maya3DViewHandle = omui.M3dView()
-    activeView = maya3DViewHandle.active3dView()
+    if (not activeView): activeView = omui.M3dView.active3dView()
 
-    clickPos = om.MPoint()
-    clickDir = om.MVector()
-
-    activeView.viewToWorld(int(screenX), int(screenY), clickPos, clickDir)
+    clickPos, clickDir = activeView.viewToWorld(int(screenX), int(screenY))
 
     worldPos = point(clickPos.x, clickPos.y, clickPos.z)
     worldDir = point(clickDir.x, clickDir.y, clickDir.z)
@@ -1333,21 +3089,35 @@ def getViewportClick(screenX, screenY):
 
 
 
+def getViewportClicks(screenPoints, activeView=None):
+    '''
+    batch version of getViewportClick: return the lists of world positions and directions (point objects) of the (x, y) screenPoints
+    the view is only queried once for the whole batch
+    '''
+    if (not activeView): activeView = omui.M3dView.active3dView()
+
+    worldPositions = []
+    worldDirections = []
+    for screenX, screenY in screenPoints:
+        clickPos, clickDir = activeView.viewToWorld(int(screenX), int(screenY))
+        worldPositions.append(point(clickPos.x, clickPos.y, clickPos.z))
+        worldDirections.append(point(clickDir.x, clickDir.y, clickDir.z))
+
+    return worldPositions, worldDirections
+
+
+
 def getCameraFarClip():
     '''
     Return current camera far clip
     '''
-    maya3DViewHandle = omui.M3dView()
-    activeView = maya3DViewHandle.active3dView()
-
-    cameraDP = om.MDagPath()
-    maya3DViewHandle.active3dView().getCamera(cameraDP)
+    cameraDP = omui.M3dView.active3dView().getCamera()
 
     camFn = om.MFnCamera(cameraDP)
-    return camFn.farClippingPlane()
+    return camFn.farClippingPlane
 
 
-def applyJitterWithReRaycast(intersected, uiValues, transform, targetList, worldUp):
+def applyJitterWithReRaycast(intersected, uiValues, transform, targetList, worldUp, farclip=None):
     '''
     Apply jitter using re-raycast algorithm - each jittered position gets a new raycast to find the actual surface
     '''
@@ -1370,7 +3140,7 @@ def applyJitterWithReRaycast(intersected, uiValues, transform, targetList, world
     raycastDir = point(0, -1, 0)  # Straight down direction
     
     # Try to find intersection at jittered position
-    newIntersection = targetSurfaceLoopIntersect(targetList, raycastStart, raycastDir)
+    newIntersection = targetSurfaceLoopIntersect(targetList, raycastStart, raycastDir, farclip)
     
     if newIntersection:
         # Use the new intersection point and all available attributes
@@ -1378,70 +3148,198 @@ def applyJitterWithReRaycast(intersected, uiValues, transform, targetList, world
         intersected.hitFace = newIntersection.hitFace
         intersected.hitTriangle = newIntersection.hitTriangle  # Correct attribute name
         intersected.dagMeshTargetSurface = newIntersection.dagMeshTargetSurface
+        intersected.fnMeshTargetSurface = newIntersection.fnMeshTargetSurface
+        intersected.targetCacheEntry = newIntersection.targetCacheEntry
+        intersected.hitBary = newIntersection.hitBary
 
-def targetSurfaceLoopIntersect(targetList, clickPos, clickDir):
+def targetSurfaceLoopIntersect(targetList, clickPos, clickDir, farclip=None, locality=None):
     '''
-    loop through all the object in targetList and intersect them with click (world pos, direction). creates an intersectionPoint object for each intersection
-    sort the list of intersection and return the closest intersectionPoint object from the click world position, return None if no intersection found
+    intersect the objects in targetList with click (world pos, direction), nearest bounding boxes first (see getClosestTargetHit)
+    optional locality (strokeLocality) to test the faces around the previous hit of the stroke first
+    return the closest intersectionPoint object from the click world position, return None if no intersection found
     '''
-    ilist = intersectionList()
-    farclip = getCameraFarClip()
-    for obj,data in targetList.obj.items():
-        #loop through each object in the targetList
-        intersected = intersectTargetSurface(data[0], clickPos, clickDir, farclip)
-        if (intersected):
-            #got meh an intersected
-            ilist.addPoint(intersected)
+    if (farclip is None): farclip = getCameraFarClip()
+    return sp3dRaycastBackend.intersect(targetList, clickPos, clickDir, farclip, locality)
+
 
-    return ilist.getClosest(clickPos)
+def setRaycastBackend(backend):
+    '''
+    activate the raycast backend by index in sp3dRaycastBackends (as stored in the sp3dRaycastBackend optionVar)
+    fall back to the maya API backend if the requested one isn't available, return the active backend
+    '''
+    global sp3dRaycastBackend
+    backend = int(backend)
+    if (backend < 0 or backend >= len(sp3dRaycastBackends) or not sp3dRaycastBackends[backend].isAvailable()):
+        backend = 0
+    sp3dRaycastBackend = sp3dRaycastBackends[backend]
+    return sp3dRaycastBackend
 
 
-def intersectTargetSurface(targetdag, clickPos, clickDir, farclip=1.0):
+def getClosestTargetHit(targetList, clickPos, clickDir, farclip, hitBuffer, skipKey=None):
+    '''
+    find the closest hit of the ray among the targetList objects, testing the targets near to far by bounding box entry distance
+    the best hit distance so far is the max parameter of the next tests, and the loop stops at the first box farther than the best hit
+    optional skipKey of a target not to test (already tested by the caller)
+    return (distance, key, targetCacheEntry, hit point, face, triangle, barycentrics) of the closest hit, None if no intersection found
+    '''
+    raySource = clickPos.asMFPoint()
+    rayDir = clickDir.asMFVector()
+    rayLength = rayDir.length()
+    bestDistance = farclip
+    closest = None
+
+    for boxDistance,obj in sp3dTargetCache.getCandidates(targetList, clickPos, clickDir, farclip):
+        if (boxDistance > bestDistance):
+            #candidates are sorted, none of the remaining targets can beat the current hit
+            break
+        if (obj == skipKey): continue
+        target = sp3dTargetCache.get(obj, targetList.obj[obj][0])
+        if (not target or not target.isValid()): continue
+        if (hitBuffer.intersect(target, raySource, rayDir, bestDistance / rayLength)):
+            distance = hitBuffer.getParam() * rayLength
+            if (distance <= bestDistance):
+                #only the winning hit data is kept, no intersectionPoint for the losing ones
+                bestDistance = distance
+                closest = hitBuffer.getClosest(distance, obj, target)
+                if (sp3d_MFn): print ("Target Hit: %s || Face Hit: %i || Tri Hit: %i" % (obj, closest[4], closest[5]))
+
+    return closest
+
+
+def bvhSurfaceIntersect(targetList, clickPos, clickDir, farclip=1.0):
     '''
-    intersect a single object from the click world pos and direction. optional farclip distance
-    return an intersectionPoint object if there was any intersection
-    return None otherwise
+    intersect all the targets at once through the cached spPaint3dBVH2025 hierarchy (see targetCache.updateBVH)
+    return the closest intersectionPoint object, None if no intersection found
     '''
-    currentHitFP = om.MFloatPoint() #current intersection
-    hitFace = om.MScriptUtil()
-    hitTri = om.MScriptUtil()
+    bvh = sp3dTargetCache.getBVH(targetList)
+    #testing both directions like the maya backend does
+    hit = bvh.closestHit((clickPos.x, clickPos.y, clickPos.z), (clickDir.x, clickDir.y, clickDir.z), farclip, True)
+    if (not hit): return None
+    if (sp3d_MFn): print ("BVH Hit: %s || Face Hit: %i || Tri Hit: %i" % (hit.meshID, hit.face, hit.triangle))
+    target = sp3dTargetCache.entries[hit.meshID]
+    return intersectionPoint(point(hit.point[0], hit.point[1], hit.point[2]), hit.face, hit.triangle, target.dagPath, target.fnMesh, target, (1.0 - hit.u - hit.v, hit.u, hit.v))
 
-    hitFace.createFromInt(0)
-    hitTri.createFromInt(0)
 
-    hitFaceptr = hitFace.asIntPtr()
-    hitTriptr = hitTri.asIntPtr()
+def targetSurfaceBatchIntersect(targetList, clickPositions, clickDirections, farclip=None, locality=None):
+    '''
+    batch version of targetSurfaceLoopIntersect: intersect every ray (lists of point objects for world pos and direction) with all the objects in targetList
+    optional locality (strokeLocality) to test the faces around the previous hit of the stroke first, the rays being cast in order
+    return an intersectionBatch object holding the closest hit of each ray
+    '''
+    if (farclip is None): farclip = getCameraFarClip()
+    return sp3dRaycastBackend.batchIntersect(targetList, clickPositions, clickDirections, farclip, locality)
 
-    targetDAGPath = getDAGObject(targetdag)
 
-    if (targetDAGPath):
-        #returned targetDAGPath is sort of valid
-        fnMesh = om.MFnMesh( targetDAGPath )
-        hit = fnMesh.closestIntersection( clickPos.asMFPoint(),
-                                clickDir.asMFVector(),
-                                None,
-                                None,
-                                True,
-                                om.MSpace.kWorld,
-                                farclip,
-                                True,
-                                None,
-                                currentHitFP,
-                                None,
-                                hitFaceptr,
-                                hitTriptr,
-                                None,
-                                None)
-        if (hit):
-            #there was a positive intersection
-            if (sp3d_MFn): print ("Face Hit: %i || Tri Hit: %i" % (hitFace.getInt(hitFaceptr),hitTri.getInt(hitTriptr)))
-            return intersectionPoint(point(currentHitFP.x, currentHitFP.y, currentHitFP.z), hitFace.getInt(hitFaceptr), hitTri.getInt(hitTriptr), targetDAGPath)
+def mayaSurfaceBatchIntersect(targetList, clickPositions, clickDirections, farclip=1.0, locality=None):
+    '''
+    maya API backend batch query, the far clip and API buffers are set up once for the whole batch instead of once per ray
+    optional locality (strokeLocality): every ray first tests the faces around the hit of the previous one
+    return an intersectionBatch object
+    '''
+    targetKeys = list(targetList.obj.keys())
+    targetIndices = dict((obj, index) for index, obj in enumerate(targetKeys))
+    batch = intersectionBatch(len(clickPositions), targetKeys)
+
+    #API buffers shared by all the rays of the batch
+    hitBuffer = rayHitBuffer()
+    targets = {}
+    for i in range(batch.count):
+        if (locality): closest = locality.intersect(targetList, clickPositions[i], clickDirections[i], farclip, hitBuffer)
+        else: closest = getClosestTargetHit(targetList, clickPositions[i], clickDirections[i], farclip, hitBuffer)
+        if (not closest): continue
+        batch.distances[i], obj, targets[i], batch.points[i], batch.faces[i], batch.triangles[i], batch.barycentrics[i] = closest
+        batch.targets[i] = targetIndices[obj]
+
+    #hard normals, computed for the winning hits only
+    for i in range(batch.count):
+        if (batch.targets[i] < 0): continue
+        normal = intersectionPoint(batch.points[i], batch.faces[i], batch.triangles[i], targets[i].dagPath, targets[i].fnMesh, targets[i], batch.barycentrics[i]).getHitNormal()
+        batch.normals[i] = (normal.x, normal.y, normal.z)
+
+    return batch
+
+
+def bvhSurfaceBatchIntersect(targetList, clickPositions, clickDirections, farclip=1.0):
+    '''
+    batch version of bvhSurfaceIntersect: the whole batch traverses the cached spPaint3dBVH2025 hierarchy as a single ray packet
+    return an intersectionBatch object
+    '''
+    bvh = sp3dTargetCache.getBVH(targetList)
+    batch = intersectionBatch(len(clickPositions), list(bvh.meshKeys))
+    if (not batch.count): return batch
+
+    origins = np.array([(pos.x, pos.y, pos.z) for pos in clickPositions], dtype=np.float64)
+    directions = np.array([(vec.x, vec.y, vec.z) for vec in clickDirections], dtype=np.float64)
+    distance, mesh, tri, u, v = bvh.closestHits(origins, directions, farclip, True)
+
+    hits = np.nonzero(tri >= 0)[0]
+    directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+    points = origins[hits] + directions[hits] * distance[hits, None]
+    for n, i in enumerate(hits):
+        hitBVH = bvh.getMesh(mesh[i])
+        normal = hitBVH.getTriangleNormals(tri[i:i + 1])[0]
+        batch.points[i] = point(float(points[n, 0]), float(points[n, 1]), float(points[n, 2]))
+        batch.normals[i] = (float(normal[0]), float(normal[1]), float(normal[2]))
+        batch.faces[i] = int(hitBVH.triFace[tri[i]])
+        batch.triangles[i] = int(hitBVH.triIndex[tri[i]])
+        batch.targets[i] = int(mesh[i])
+        batch.distances[i] = abs(float(distance[i]))
+        batch.barycentrics[i] = (1.0 - float(u[i]) - float(v[i]), float(u[i]), float(v[i]))
+
+    return batch
+
+
+def getMeshTriangles(fnMesh):
+    '''
+    return the world space triangulation of the fnMesh mesh as numpy arrays, as expected by meshBVH.addMesh:
+    points, triangle vertices, face number of each triangle and triangle number inside its face
+    '''
+    points = fnMesh.getPoints(om.MSpace.kWorld)
+    triangleCounts, triangleVertices = fnMesh.getTriangles()
 
-    #reaches here only if no intersection or not a valid targetDAGPath
-    return None
+    pointArray = np.array([(p.x, p.y, p.z) for p in points]).reshape(-1, 3)
+    counts = np.array(list(triangleCounts), dtype=np.int64)
+    vertices = np.array(list(triangleVertices), dtype=np.int64).reshape(-1, 3)
 
+    faces = np.repeat(np.arange(len(counts)), counts)
+    indices = np.arange(len(faces)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return pointArray, vertices, faces, indices
 
 
+def getRayBoxDistance(clickPos, clickDir, boxMin, boxMax):
+    '''
+    slab test of the ray (point objects) against the box ((x, y, z) tuples), both ray directions are considered
+    return the distance along the normalized direction at which the ray enters the box (0 if it starts inside), None if it misses it
+    '''
+    origin = (clickPos.x, clickPos.y, clickPos.z)
+    length = math.sqrt(clickDir.x*clickDir.x + clickDir.y*clickDir.y + clickDir.z*clickDir.z)
+    direction = (clickDir.x/length, clickDir.y/length, clickDir.z/length)
+    tNear = -float('inf')
+    tFar = float('inf')
+    for axis in range(3):
+        if (direction[axis] == 0.0):
+            #ray parallel to the slab
+            if (origin[axis] < boxMin[axis] or origin[axis] > boxMax[axis]): return None
+            continue
+        t1 = (boxMin[axis] - origin[axis]) / direction[axis]
+        t2 = (boxMax[axis] - origin[axis]) / direction[axis]
+        tNear = max(tNear, min(t1, t2))
+        tFar = min(tFar, max(t1, t2))
+        if (tNear > tFar): return None
+
+    if (tNear > 0.0): return tNear
+    elif (tFar < 0.0): return -tFar
+    else: return 0.0
+
+
+def removeCallbacks(callbackIDs):
+    '''
+    remove all the API callbacks of the callbackIDs list and empty it
+    '''
+    for callbackID in callbackIDs:
+        om.MMessage.removeCallback(callbackID)
+    del callbackIDs[:]
+
 
 def getDAGObject(dagstring):
     '''
@@ -1449,10 +3347,8 @@ def getDAGObject(dagstring):
     return None if the minimum checks on dagstring don't checkout
     '''
     sList = om.MSelectionList()
-    meshDP = om.MDagPath()
-    #sList.clear() #making sure to clear the content of the MSelectionList in case we are looping through multiple objects
-    om.MGlobal.getSelectionListByName(dagstring, sList)
-    sList.getDagPath(0,meshDP)
+    sList.add(dagstring)
+    meshDP = sList.getDagPath(0)
 
     return meshDP
 
@@ -1470,7 +3366,44 @@ def getCorrectedDistance(distance, unit):
     return the corrected distance using proper unit to convert back to centimeters
     '''
     if(unit=='cm'): return distance
-    else: return (distance/(sp3dUnit[unit]))
+    else: return (distance/getUnitFactor(unit))
+
+def getUnitFactor(unit):
+    '''
+    return the factor converting a length from centimeters (internal unit) to unit
+    units missing from sp3dUnit are resolved once with mc.convertUnit and added to it
+    '''
+    if (unit not in sp3dUnit):
+        sp3dUnit[unit] = float(mc.convertUnit(1.0, fromUnit='cm', toUnit=unit))
+    return sp3dUnit[unit]
+
+def convertPositions(positions, unitFactor):
+    '''
+    convert in place a batch of positions (point objects or numpy (n, 3) array) from centimeters to the unit of the unitFactor, return the positions
+    '''
+    if (unitFactor == 1.0): return positions
+    if (np is not None and isinstance(positions, np.ndarray)):
+        positions *= unitFactor
+        return positions
+    for position in positions:
+        position.x *= unitFactor
+        position.y *= unitFactor
+        position.z *= unitFactor
+    return positions
+
+def checkUnitFactors(tolerance=1e-9):
+    '''
+    debug: compare the sp3dUnit factors against mc.convertUnit for every supported unit
+    return a dictionnary unit -> (sp3dUnit factor, mc.convertUnit factor) of the mismatching units, empty if all of them match
+    '''
+    mismatches = {}
+    for unit, factor in sorted(sp3dUnit.items()):
+        for length in (1.0, 123.456, -0.5):
+            expected = float(mc.convertUnit(length, fromUnit='cm', toUnit=unit))
+            if (abs(length * factor - expected) > tolerance * max(1.0, abs(expected))):
+                mismatches[unit] = (factor, expected / length)
+                break
+    return mismatches
 
 def logDebugInfo(info):
     '''
@@ -1478,3 +3411,31 @@ def logDebugInfo(info):
     '''
     with open(sp3d_dbgfile,'w') as f:
         f.write(info)
+
+def benchmarkRaycast(targetList, columns=20, rows=20, smooth=False):
+    '''
+    cast a columns x rows grid of rays through the active viewport like the drag events do (view click, target intersection & hit normal)
+    print and return the number of events per second, run it on the same scene & camera before/after a change to compare
+    '''
+    view = strokeView()
+    sp3dRaycastBackend.prepare(targetList)
+    width = view.activeView.portWidth()
+    height = view.activeView.portHeight()
+    farclip = view.getFarClip()
+    events = columns * rows
+    hits = 0
+
+    start = mc.timerX()
+    for i in range(columns):
+        for j in range(rows):
+            worldPos, worldDir = view.getViewportClick((i + 0.5) * width / columns, (j + 0.5) * height / rows)
+            intersected = targetSurfaceLoopIntersect(targetList, worldPos, worldDir, farclip)
+            if (intersected):
+                intersected.getHitNormal(smooth)
+                hits += 1
+    elapsed = mc.timerX(startTime=start)
+    view.release()
+
+    rate = events / elapsed if elapsed > 0 else float('inf')
+    print ("benchmarkRaycast: %i events (%i hits) in %.3f s -> %.1f events/s (%s backend)" % (events, hits, elapsed, rate, sp3dRaycastBackend.name))
+    return rate
@@ -22,6 +22,12 @@ import sys
 import importlib
 import webbrowser
 
+try:
+    import numpy as np
+except ImportError:
+    #numpy isn't shipped with this maya install, the random streams fall back on the random module
+    np = None
+
 # Standard Maya script import with reload support for Maya 2026 + Python 3
 try:
     import spPaint3dContext2025
@@ -34,10 +40,68 @@ def getIconPath(iconName):
     return userScriptDir + 'icons/' + iconName
 
 spPaint3dGuiID = "spPaint3d2025"
-spPaint3dGuiID_Height = 750
+spPaint3dGuiID_Height = 770
 spPaint3dSetupID = "spPaint3dSetup2025"
 spPaint3dVersion = 2025.0
 
+#random values pre-generated at once by each sp3dRandomStream stream
+sp3dRandomBlock = 256
+#named streams of sp3dRandomStream, each option draws from its own stream so toggling one option doesn't change the values of the others
+sp3dRandomStreams = ('rotate', 'scale', 'jitter', 'source')
+
+class sp3dRandomStream (object):
+    '''
+    per stroke random generator: every named stream (see sp3dRandomStreams) pre-generates blocks of uniform values
+    a stroke started with the same seed draws the same values (reproducible strokes), a None seed draws a new random seed
+    '''
+    def __init__(self, seed=None, blockSize=sp3dRandomBlock):
+        '''
+        initialise attributes
+        '''
+        self.blockSize = blockSize
+        self.seed = None #seed of the current stroke
+        self.generators = {} #stream name -> numpy Generator (or random.Random without numpy)
+        self.blocks = {} #stream name -> list of pre-generated uniform values in [0, 1)
+        self.index = {} #stream name -> index of the next value to draw in its block
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        '''
+        restart every stream from seed (new random seed if None)
+        '''
+        self.seed = seed if seed is not None else rand.getrandbits(32)
+        for streamIndex, name in enumerate(sp3dRandomStreams):
+            if np is not None:
+                self.generators[name] = np.random.default_rng([self.seed, streamIndex])
+            else:
+                self.generators[name] = rand.Random('%i:%s' % (self.seed, name))
+            self.blocks[name] = []
+            self.index[name] = 0
+
+    def random(self, name):
+        '''
+        return the next uniform value in [0, 1) of the name stream
+        '''
+        index = self.index[name]
+        block = self.blocks[name]
+        if index >= len(block):
+            generator = self.generators[name]
+            if np is not None:
+                block = generator.random(self.blockSize).tolist()
+            else:
+                block = [generator.random() for i in range(self.blockSize)]
+            self.blocks[name] = block
+            index = 0
+        self.index[name] = index + 1
+        return block[index]
+
+    def uniform(self, name, low, high):
+        '''
+        return the next value of the name stream between low and high
+        '''
+        return low + (high - low) * self.random(name)
+
+
 #debug to log some operation down to the script editor
 sp3d_log = False
 
@@ -49,6 +113,7 @@ sp3dOptionVars = {
                     "sp3dTransformScale": ("iv", 1, "transformScale"),
                     "sp3dTransformScaleUniform": ("iv", 1, "transformScaleUniform"),
                     "sp3dInstance": ("iv", 0, "instance"),
+                    "sp3dInstancer": ("iv", 0, "instancer"),
                     "sp3dRandom": ("iv", 1, "random"),
                     "sp3dAlign": ("iv", 1, "align"),
                     "sp3dPaintFlux": ("iv", 1, "paintFlux"),
@@ -61,6 +126,13 @@ sp3dOptionVars = {
                     "sp3dPaintOffset": ("fv", 0, "upOffset"),
                     "sp3dPlaceRotate": ("fv", 45, "placeRotate"),
                     "sp3dContinuousTransform": ("iv", 0, "continuousTransform"),
+                    "sp3dProxyCursor": ("iv", 0, "proxyCursor"),
+                    "sp3dCursorPoolDepth": ("fv", 0, "cursorPoolDepth"),
+                    "sp3dLocalRaycast": ("iv", 0, "localRaycast"),
+                    "sp3dDeferredCreation": ("iv", 0, "deferredCreation"),
+                    "sp3dRefreshRate": ("fv", 30, "refreshRate"),
+                    "sp3dRandomSeed": ("fv", 0, "randomSeed"),
+                    "sp3dRaycastBackend": ("fv", 0, "raycastBackend"),
                     "sp3dJitter": ("iv", 0, "jitter"),
                     "sp3dJitterAlgorithm": ("iv", 1, "jitterAlgorithm"),
                     "sp3dPreserveInConn": ("iv", 1, "preserveConn"),
@@ -89,6 +161,7 @@ class sp3dToolOption (object):
         self.transformScale = True
         self.transformScaleUniform = True
         self.instance = False
+        self.instancer = False #True=paint strokes feed a single particle instancer instead of creating a transform per placement
         self.random = True
         self.align = True
         self.paintFlux = True #True=distance / False=timer
@@ -102,6 +175,13 @@ class sp3dToolOption (object):
         self.placeRotate = 45
         self.rotateIncrementSnap = False #Paint mode rotate increment snap
         self.continuousTransform = False #Place mode only option, retransform cursor at every drag event
+        self.proxyCursor = False #Place mode only option, drag a bounding box proxy of the source and create the object on release
+        self.cursorPoolDepth = 0 #Place mode only option, hidden cursor candidates duplicated ahead per source (see spPaint3dContext2025.cursorPool), 0=off
+        self.localRaycast = False #True=drag events first test the faces around the previous hit of the stroke (maya raycast backend)
+        self.deferredCreation = False #True=paint strokes queue the placements and create the objects in batches (one undo chunk per batch)
+        self.refreshRate = 30 #max viewport redraws per second while painting/placing, 0=redraw on every event
+        self.randomSeed = 0 #seed of the random values of every stroke (reproducible strokes), 0=new random seed per stroke
+        self.raycastBackend = 0 #float value so it doesnt get converted into boolean / index in spPaint3dContext2025.sp3dRaycastBackends: 0=maya API / 1=BVH (numpy)
         self.upOffset = 0
         self.preserveConn = True
         self.smoothNormal = False #false=decal mode, force pure normal from intersected triangle / true=smoothed normal per neighboring edges
@@ -476,21 +556,20 @@ class sp3dTransform (object):
         self.scale = scale
         self.uJitter = uJitter
         self.vJitter = vJitter
+        self.random = sp3dRandomStream() #random values source, reset with the stroke seed by the contexts
 
     def getRandomRotate (self, uiValues=None):
         '''
         return a (x,y,z) tuple with properly randomized value between the self.rotate bounds
         '''
         x, y, z = self.rotate
+        uniform = self.random.uniform
+        randxyz = (uniform('rotate', x[0], x[1]), uniform('rotate', y[0], y[1]), uniform('rotate', z[0], z[1]))
         if uiValues and uiValues.rotateIncrementSnap and uiValues.placeRotate > 0:
             # Snap to increment logic
-            randx = self.snapToIncrement(rand.uniform(x[0], x[1]), uiValues.placeRotate, x[0], x[1])
-            randy = self.snapToIncrement(rand.uniform(y[0], y[1]), uiValues.placeRotate, y[0], y[1])
-            randz = self.snapToIncrement(rand.uniform(z[0], z[1]), uiValues.placeRotate, z[0], z[1])
-            randxyz = (round(randx, 3), round(randy, 3), round(randz, 3))
-        else:
-            # Original random behavior
-            randxyz = (round(rand.uniform(x[0], x[1]), 3), round(rand.uniform(y[0], y[1]), 3), round(rand.uniform(z[0], z[1]), 3))
+            randxyz = (self.snapToIncrement(randxyz[0], uiValues.placeRotate, x[0], x[1]),
+                       self.snapToIncrement(randxyz[1], uiValues.placeRotate, y[0], y[1]),
+                       self.snapToIncrement(randxyz[2], uiValues.placeRotate, z[0], z[1]))
         return randxyz
 
     def snapToIncrement(self, value, increment, minVal, maxVal):
@@ -510,10 +589,10 @@ class sp3dTransform (object):
         '''
         x, y, z = self.scale
         if (uniform):
-            randxyz = round(rand.uniform(x[0], x[1]), 3)
+            randxyz = self.random.uniform('scale', x[0], x[1])
             return (randxyz, randxyz, randxyz)
         else:
-            randxyz = (round(rand.uniform(x[0], x[1]), 3), round(rand.uniform(y[0], y[1]), 3), round(rand.uniform(z[0], z[1]), 3))
+            randxyz = (self.random.uniform('scale', x[0], x[1]), self.random.uniform('scale', y[0], y[1]), self.random.uniform('scale', z[0], z[1]))
             return randxyz
     
     def getRandomJitter (self, space):
@@ -521,7 +600,49 @@ class sp3dTransform (object):
         return a random value between the min and max from the corresponding space. space must be either 'uJitter' or 'vJitter'
         '''
         min,max = self.__dict__[space]        
-        return round(rand.uniform(min,max), 3)
+        return self.random.uniform('jitter', min, max)
+
+
+class sp3dAliasSampler (object):
+    '''
+    weighted random picker using the alias method: built once in O(n), every pick is O(1)
+    '''
+    def __init__(self, items, weights=None):
+        '''
+        build the probability and alias tables of the items, equal weights if weights is None or if their sum isn't positive
+        negative weights are considered null
+        '''
+        self.items = list(items)
+        count = len(self.items)
+        weights = [max(0.0, float(weight)) for weight in weights] if weights else [1.0] * count
+        total = sum(weights)
+        if total <= 0: weights, total = [1.0] * count, float(count)
+
+        scaled = [weight * count / total for weight in weights]
+        self.prob = [1.0] * count #probability to keep the column item
+        self.alias = list(range(count)) #item picked otherwise
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            if scaled[more] < 1.0: small.append(more)
+            else: large.append(more)
+
+    def pick(self, stream=None):
+        '''
+        return a random item according to the weights, drawing from the 'source' stream of the stream sp3dRandomStream if given
+        '''
+        if stream:
+            column = int(stream.random('source') * len(self.items))
+            if stream.random('source') < self.prob[column]: return self.items[column]
+        else:
+            column = int(rand.random() * len(self.items))
+            if rand.random() < self.prob[column]: return self.items[column]
+        return self.items[self.alias[column]]
 
 
 class sp3dObjectList (object):
@@ -546,7 +667,19 @@ class sp3dObjectList (object):
         self.obj = {} #dictionnary of entries
         self.i = 0 #index values used if this is a source object list using sequential mode distribution
         self.auth = self.authType[authorized] #used to sort 'valid' object when using the add method
+        self.kind = authorized #target lists also keep their entries registered in the context module target cache, source lists in its source cache
         self.errorHandle = errorHandle
+        self.sortedKeys = None #cached sorted keys of self.obj (sequential distribution), None when the list changed
+        self.sampler = None #cached sp3dAliasSampler of the entries (random distribution), None when the list changed
+        self.samplerWeights = None #copy of the sourceWeights the sampler was built with, None if unweighted
+
+    def invalidate(self):
+        '''
+        forget the cached keys and sampler, to call whenever the entries change
+        '''
+        self.sortedKeys = None
+        self.sampler = None
+        self.samplerWeights = None
 
     def validateObjects(self):
         if not self.obj: 
@@ -573,11 +706,14 @@ class sp3dObjectList (object):
                             found = (mc.ls(k, long=True) or [k])[0]
                             break
                 if found:
+                    # the prototype of the previous draw node is outdated
+                    if self.kind == 'source': spPaint3dContext2025.sp3dSourceCache.release(n)
                     # irjuk vissza a talalt draw node-ot
                     if isinstance(data, list):
                         data[0] = found
                     elif isinstance(data, tuple):
                         self.obj[obj] = (found,) + data[1:]
+                    self.invalidate()
                 else:
                     return False
 
@@ -689,6 +825,14 @@ class sp3dObjectList (object):
             else:
                 # Fallback to transform if no valid shape found (e.g., for locators or other non-mesh objects)
                 self.obj[key] = (key, activation, proba, align)
+        self.invalidate()
+
+        if self.kind == 'target':
+            # build the ray acceleration structure once, it is reused by every stroke until the mesh is edited
+            spPaint3dContext2025.sp3dTargetCache.register(key, self.obj[key][0])
+        elif self.kind == 'source':
+            # query the source metadata once, it is reused by every placement until the source is edited
+            spPaint3dContext2025.sp3dSourceCache.register(self.obj[key][0])
 
         return key, True
 
@@ -707,7 +851,10 @@ class sp3dObjectList (object):
         '''
         #TODO: check if key really exists return False
         #TODO: delete the key:data and return True
+        if self.kind == 'source': spPaint3dContext2025.sp3dSourceCache.release(self.obj[obj][0])
         del self.obj[obj]
+        self.invalidate()
+        if self.kind == 'target': spPaint3dContext2025.sp3dTargetCache.release(obj)
 
     def clrObj(self):
         '''
@@ -715,92 +862,54 @@ class sp3dObjectList (object):
         '''
         self.obj = {}
         self.i = 0
+        self.invalidate()
+        if self.kind == 'target': spPaint3dContext2025.sp3dTargetCache.clear()
+        if self.kind == 'source': spPaint3dContext2025.sp3dSourceCache.clear()
+
+    def getSortedKeys(self):
+        '''
+        return the sorted keys of self.obj, sorted again only when the entries changed
+        '''
+        if self.sortedKeys is None:
+            self.sortedKeys = sorted(self.obj.keys())
+        return self.sortedKeys
+
+    def getSampler(self, sourceWeights=None):
+        '''
+        return the sp3dAliasSampler of the entries dagMesh, rebuilt only when the entries or the sourceWeights changed
+        the weight of an entry is looked up by its transform full path then short name (default 1.0)
+        '''
+        if sourceWeights is not None and not isinstance(sourceWeights, dict):
+            if sp3d_log: print("DEBUG: sourceWeights parameter is not a dict in getSampler: %s" % type(sourceWeights))
+            sourceWeights = {}
+
+        if self.sampler is None or sourceWeights != self.samplerWeights:
+            keys = self.getSortedKeys()
+            weights = None
+            if sourceWeights:
+                # the keys are the transforms full paths (see addObj)
+                weights = [sourceWeights.get(key, sourceWeights.get(key.split('|')[-1], 1.0)) for key in keys]
+            self.sampler = sp3dAliasSampler([self.obj[key][0] for key in keys], weights)
+            self.samplerWeights = dict(sourceWeights) if sourceWeights is not None else None
+        return self.sampler
 
-    def getRandom(self, weighted=False, sourceWeights=None):
+    def getRandom(self, weighted=False, sourceWeights=None, stream=None):
         '''
         will return a random entry dagMesh from the dictionnary.
         will return a weighted random entry using the sourceWeights dict if weighted=True
-        will return None if the method was unsuccessful to retrieve the selected object (if object was deleted from the scene while the script was running for example)
+        the picks use a cached alias table (see getSampler): no maya call, constant time
+        stream is the optional sp3dRandomStream to draw from (reproducible strokes)
         '''
-        dkeys = list(self.obj.keys())
-        
         if weighted and sourceWeights:
-            # Ensure sourceWeights is a dictionary
-            if not isinstance(sourceWeights, dict):
-                if sp3d_log: 
-                    sourceWeightsType = type(sourceWeights)
-                    print("DEBUG: sourceWeights parameter is not a dict in getRandom: %s" % sourceWeightsType)
-                sourceWeights = {}
-            # Weighted random selection
-            objects = []
-            weights = []
-            
-            for key in dkeys:
-                dag = self.obj[key][0]  # Get the DAG path (shape node)
-                
-                # Try to match weight by transform name (parent of shape)
-                import maya.cmds as mc
-                if mc.objExists(dag):
-                    # Get the transform parent if dag is a shape
-                    if mc.nodeType(dag) != 'transform':
-                        parents = mc.listRelatives(dag, parent=True, fullPath=True) or []
-                        if parents:
-                            transform_dag = parents[0]
-                        else:
-                            transform_dag = dag
-                    else:
-                        transform_dag = dag
-                    
-                    # Try different name formats for weight lookup
-                    weight = sourceWeights.get(transform_dag, None)  # Full path
-                    if weight is None:
-                        short_name = transform_dag.split('|')[-1]  # Short name
-                        weight = sourceWeights.get(short_name, 1.0)
-                else:
-                    weight = 1.0
-                
-                objects.append(dag)
-                weights.append(weight)
-
-            
-            # Use weighted random selection (Python 2 compatible)
-            import random
-            total_weight = sum(weights)
-            if total_weight <= 0:
-                # Fallback to equal weights if all weights are 0 or negative
-                selected = objects[random.randint(0, len(objects) - 1)]
-            else:
-                # Create cumulative weights
-                cumulative_weights = []
-                cumulative = 0
-                for weight in weights:
-                    cumulative += weight
-                    cumulative_weights.append(cumulative)
-                
-                # Generate random number and find selection
-                rand_val = random.uniform(0, total_weight)
-                for i, cum_weight in enumerate(cumulative_weights):
-                    if rand_val <= cum_weight:
-                        selected = objects[i]
-                        break
-                else:
-                    # Fallback (should not happen)
-                    selected = objects[-1]
-            
-            return selected
-        else:
-            # Original random selection
-            dag = self.obj[dkeys[rand.randint(0, len(dkeys) - 1)]]
-            return dag[0]
+            return self.getSampler(sourceWeights).pick(stream)
+        return self.getSampler().pick(stream)
 
     def getNext(self):
         '''
         will return the dagMesh of the next entry in the dictionnary. will increment the index by 1 (index will be calculated modulo the dictionnary length will polling for the next entry).
-        will return None if the method was unsuccessful to retrieve the selected object (if object was deleted from the scene while the script was running for example)
         '''
         #TODO: implement boolean flag
-        dkeys = list(self.obj.keys())
-        dkeys.sort()
+        dkeys = self.getSortedKeys()
         dag = self.obj[dkeys[self.i % len(dkeys)]]
         self.i += 1
         return dag[0]
@@ -947,18 +1056,20 @@ class spPaint3dWin2025 (object):
         #----------------------
         # Paint Contexts
         #----------------------
-        self.uiPaintFrame = mc.frameLayout(label='Paint', cll=True, collapseCommand=lambda:self.resizeWindow('collapse', 61), expandCommand=lambda:self.resizeWindow('expand', 61), mh=5, mw=5)
+        self.uiPaintFrame = mc.frameLayout(label='Paint', cll=True, collapseCommand=lambda:self.resizeWindow('collapse', 81), expandCommand=lambda:self.resizeWindow('expand', 81), mh=5, mw=5)
         self.uiPaintForm = mc.formLayout(numberOfDivisions=100, width=255)
         self.uiPaintDupSCB = mc.symbolCheckBox(w=52, h=18, ann='Duplicate: Instance or Copy', ofi=getIconPath('sp3dduplicate.xpm'), oni=getIconPath('sp3dinstance.xpm'), changeCommand=lambda * args:self.uiCheckBoxCallback("instance", args))
         self.uiPaintRandSCB = mc.symbolCheckBox(w=52, h=18, ann='Object distribution: Random or Sequential', ofi=getIconPath('sp3dsequence.xpm'), oni=getIconPath('sp3drandom.xpm'), changeCommand=lambda * args:self.uiCheckBoxCallback("random", args))
         self.uiPaintAlignSCB = mc.symbolCheckBox(w=100, h=18, ann='Align generated objects to the target surface', ofi=getIconPath('sp3dalignoff.xpm'), oni=getIconPath('sp3dalign.xpm'), changeCommand=lambda * args:self.uiCheckBoxCallback("align", args))
         self.uiPaintCtxBtn = mc.symbolButton(w=105, h=28, ann='Paint', image=getIconPath('sp3dpaint.xpm'), command=lambda * args:self.genericContextCallback("PaintCtx"))
         self.uiPlaceCtxBtn = mc.symbolButton(w=105, h=28, ann='Place', image=getIconPath('sp3dplace.xpm'), command=lambda * args:self.genericContextCallback("PlaceCtx"))
+        self.uiPaintInstancerCheck = mc.checkBox(label='Point instancer output', ann='Paint strokes feed a single particle instancer instead of creating one transform per object (keeps heavy scenes light, no hierarchy grouping)', changeCommand=lambda * args:self.uiCheckBoxCallback("instancer", args))
         
         mc.formLayout(self.uiPaintForm, edit=True,
-                        attachForm=[(self.uiPaintDupSCB, 'top', 0)],
+                        attachForm=[(self.uiPaintDupSCB, 'top', 0), (self.uiPaintInstancerCheck, 'left', 0)],
                         attachControl=[    (self.uiPaintRandSCB, 'left', 5, self.uiPaintDupSCB), (self.uiPaintAlignSCB, 'left', 5, self.uiPaintRandSCB),
-                                         (self.uiPaintCtxBtn, 'top', 5, self.uiPaintDupSCB), (self.uiPlaceCtxBtn, 'top', 5, self.uiPaintDupSCB), (self.uiPlaceCtxBtn, 'left', 5, self.uiPaintCtxBtn)])
+                                         (self.uiPaintCtxBtn, 'top', 5, self.uiPaintDupSCB), (self.uiPlaceCtxBtn, 'top', 5, self.uiPaintDupSCB), (self.uiPlaceCtxBtn, 'left', 5, self.uiPaintCtxBtn),
+                                         (self.uiPaintInstancerCheck, 'top', 5, self.uiPaintCtxBtn)])
         
         mc.setParent(self.uiTopColumn)
         
@@ -1239,6 +1350,7 @@ class spPaint3dWin2025 (object):
         if (sp3d_log): print ('input from UI: %s of type %s' % (args, args[1][0].__class__))
         self.uiValues.__dict__[args[0]] = getBoolFromMayaControl(args[1][0], self.mayaVersion)
         self.uiValues.commitVars()
+        if (args[0] == 'instancer'): self.updateUIControls(self.uiValues)
         self.updateCtx()
 
 
@@ -1250,7 +1362,8 @@ class spPaint3dWin2025 (object):
         mc.checkBox(self.uiTransformScaleCheck, edit=True, value=ui.transformScale)
         mc.checkBox(self.uiTransformScaleUniformCheck, edit=True, value=ui.transformScaleUniform)
         mc.checkBox(self.uiJitterCheck, edit=True, value=ui.jitter)
-        mc.symbolCheckBox(self.uiPaintDupSCB, edit=True, value=ui.instance)
+        mc.symbolCheckBox(self.uiPaintDupSCB, edit=True, value=ui.instance, enable=(not ui.instancer))
+        mc.checkBox(self.uiPaintInstancerCheck, edit=True, value=ui.instancer)
         mc.symbolCheckBox(self.uiPaintRandSCB, edit=True, value=ui.random)
         mc.symbolCheckBox(self.uiPaintAlignSCB, edit=True, value=ui.align)
 
@@ -1446,11 +1559,13 @@ class spPaint3dWin2025 (object):
                 #creating (or overwritring with) a paint context
                 self.errorHandle.raiseError("Engage!! Maximum Paint...")
                 self.ctx = spPaint3dContext2025.paintContext(self.uiValues, self.transform, self.sourceList, self.targetList)
+                self.ctx.refresh.errorHandle = self.errorHandle
                 self.ctx.runContext()
             elif (args[0] == 'PlaceCtx'):
                 #creating (or overwritring with) a place context
                 self.errorHandle.raiseError("Engage!! Maximum Place...")
                 self.ctx = spPaint3dContext2025.placeContext(self.uiValues, self.transform, self.sourceList, self.targetList)
+                self.ctx.refresh.errorHandle = self.errorHandle
                 self.ctx.runContext()
 
 
@@ -1534,6 +1649,17 @@ class spPaint3dWin2025 (object):
         mc.menuItem(label='Re-raycast')
         
         mc.setParent(self.uiSetupTopColumn)
+
+        #----------------------
+        # Raycast backend
+        #----------------------
+        self.uiSetupRaycastFrame = mc.frameLayout(label='Raycast Backend', marginHeight=5, marginWidth=20)
+        self.uiSetupRaycastForm = mc.formLayout(numberOfDivisions=100)
+        self.uiSetupRaycastBackendMenu = mc.optionMenu(label='Backend', ann='Ray casting engine used to find the target surfaces', changeCommand=lambda * args:self.setupRaycastBackendCallback(args))
+        for backend in spPaint3dContext2025.sp3dRaycastBackends:
+            mc.menuItem(label=backend.label, enable=backend.isAvailable())
+
+        mc.setParent(self.uiSetupTopColumn)
         
         #----------------------
         # Dev feature
@@ -1544,10 +1670,16 @@ class spPaint3dWin2025 (object):
         self.uiSetupForceVisibility = mc.checkBoxGrp(label='Force visibility', ann='Automatically make duplicated objects visible regardless of source visibility', changeCommand=lambda * args:self.setupCallback('uiSetupForceVisibility', args), numberOfCheckBoxes=1)
         self.uiSetupAllowNegativeScale = mc.checkBoxGrp(label='Allow Negative Scale', ann='Allow scale values to go below zero (enables mirroring/inversion effects)', changeCommand=lambda * args:self.setupCallback('uiSetupAllowNegativeScale', args), numberOfCheckBoxes=1)
         self.uiSetupContinuousTransform = mc.checkBoxGrp(label='Continuous transform', changeCommand=lambda * args:self.setupCallback('uiSetupContinuousTransform', args), numberOfCheckBoxes=1)
+        self.uiSetupProxyCursor = mc.checkBoxGrp(label='Proxy cursor', ann='Place mode: drag a bounding box curve of the source instead of the object itself, the object is created on release (faster with heavy assets)', changeCommand=lambda * args:self.setupCallback('uiSetupProxyCursor', args), numberOfCheckBoxes=1)
+        self.uiSetupCursorPool = mc.intFieldGrp(label='Cursor pool', ann='Place mode: hidden cursors duplicated ahead per source so switching sources is instant (0: off). Warning: a cursor taken from the pool is not removed by undo', changeCommand=lambda * args:self.setupCallback('uiSetupCursorPool', args), numberOfFields=1)
+        self.uiSetupLocalRaycast = mc.checkBoxGrp(label='Stroke-local raycast', ann='Test the faces around the previous hit first while dragging (faster on dense meshes, may miss a closer part of the same mesh)', changeCommand=lambda * args:self.setupCallback('uiSetupLocalRaycast', args), numberOfCheckBoxes=1)
+        self.uiSetupDeferredCreation = mc.checkBoxGrp(label='Deferred creation', ann='Queue the paint stroke placements and create the objects in batches (fewer scene updates while dragging, objects appear slightly behind the cursor)', changeCommand=lambda * args:self.setupCallback('uiSetupDeferredCreation', args), numberOfCheckBoxes=1)
+        self.uiSetupRandomSeed = mc.intFieldGrp(label='Random seed', ann='Seed of the random transforms, jitter and source picks of every stroke, the same seed gives the same stroke (0: new random values per stroke)', changeCommand=lambda * args:self.setupCallback('uiSetupRandomSeed', args), numberOfFields=1)
+        self.uiSetupRefreshRate = mc.intFieldGrp(label='Viewport refresh (fps)', ann='Max viewport redraws per second while dragging, lowered automatically on heavy scenes (0: redraw on every event). The last stroke redraw cost is shown in the main window status field', changeCommand=lambda * args:self.setupCallback('uiSetupRefreshRate', args), numberOfFields=1)
 
         mc.formLayout(self.uiSetupDevForm, edit=True, 
-                     attachForm=[(self.uiSetupRealTimeRampFX, 'top', 0), (self.uiSetupRealTimeRampFX, 'left', 0), (self.uiSetupForceVisibility, 'left', 0), (self.uiSetupAllowNegativeScale, 'left', 0), (self.uiSetupContinuousTransform, 'left', 0)],
-                     attachControl=[(self.uiSetupForceVisibility, 'top', 5, self.uiSetupRealTimeRampFX), (self.uiSetupAllowNegativeScale, 'top', 5, self.uiSetupForceVisibility), (self.uiSetupContinuousTransform, 'top', 5, self.uiSetupAllowNegativeScale)])
+                     attachForm=[(self.uiSetupRealTimeRampFX, 'top', 0), (self.uiSetupRealTimeRampFX, 'left', 0), (self.uiSetupForceVisibility, 'left', 0), (self.uiSetupAllowNegativeScale, 'left', 0), (self.uiSetupContinuousTransform, 'left', 0), (self.uiSetupProxyCursor, 'left', 0), (self.uiSetupCursorPool, 'left', 0), (self.uiSetupLocalRaycast, 'left', 0), (self.uiSetupDeferredCreation, 'left', 0), (self.uiSetupRefreshRate, 'left', 0), (self.uiSetupRandomSeed, 'left', 0)],
+                     attachControl=[(self.uiSetupForceVisibility, 'top', 5, self.uiSetupRealTimeRampFX), (self.uiSetupAllowNegativeScale, 'top', 5, self.uiSetupForceVisibility), (self.uiSetupContinuousTransform, 'top', 5, self.uiSetupAllowNegativeScale), (self.uiSetupProxyCursor, 'top', 5, self.uiSetupContinuousTransform), (self.uiSetupCursorPool, 'top', 5, self.uiSetupProxyCursor), (self.uiSetupLocalRaycast, 'top', 5, self.uiSetupCursorPool), (self.uiSetupDeferredCreation, 'top', 5, self.uiSetupLocalRaycast), (self.uiSetupRefreshRate, 'top', 5, self.uiSetupDeferredCreation), (self.uiSetupRandomSeed, 'top', 5, self.uiSetupRefreshRate)])
 
         mc.setParent(self.uiSetupTopColumn)
 
@@ -1580,6 +1712,13 @@ class spPaint3dWin2025 (object):
             mc.optionMenu(self.uiSetupJitterAlgorithmMenu, edit=True, value='Re-raycast')
 
         mc.checkBoxGrp(self.uiSetupContinuousTransform, edit=True, value1=ui.continuousTransform)
+        mc.checkBoxGrp(self.uiSetupProxyCursor, edit=True, value1=ui.proxyCursor)
+        mc.intFieldGrp(self.uiSetupCursorPool, edit=True, value1=int(ui.cursorPoolDepth))
+        mc.checkBoxGrp(self.uiSetupLocalRaycast, edit=True, value1=ui.localRaycast)
+        mc.checkBoxGrp(self.uiSetupDeferredCreation, edit=True, value1=ui.deferredCreation)
+        mc.intFieldGrp(self.uiSetupRefreshRate, edit=True, value1=int(ui.refreshRate))
+        mc.intFieldGrp(self.uiSetupRandomSeed, edit=True, value1=int(ui.randomSeed))
+        mc.optionMenu(self.uiSetupRaycastBackendMenu, edit=True, select=spPaint3dContext2025.sp3dRaycastBackends.index(spPaint3dContext2025.setRaycastBackend(ui.raycastBackend)) + 1)
 
 
         # toggling the proper hierarchy grouping options
@@ -1660,6 +1799,17 @@ class spPaint3dWin2025 (object):
         self.uiValues.commitVars()
         if sp3d_log: print('Jitter algorithm changed to: %s (value: %s)' % (selected, self.uiValues.jitterAlgorithm))
 
+    def setupRaycastBackendCallback(self, *args):
+        '''
+        Callback for raycast backend option menu
+        '''
+        selected = mc.optionMenu(self.uiSetupRaycastBackendMenu, query=True, select=True) - 1
+        self.uiValues.raycastBackend = float(spPaint3dContext2025.sp3dRaycastBackends.index(spPaint3dContext2025.setRaycastBackend(selected)))
+
+        self.uiValues.commitVars()
+        self.updateUISetupControls(self.uiValues)
+        if sp3d_log: print('Raycast backend changed to: %s (value: %s)' % (args[0][0], self.uiValues.raycastBackend))
+
     def setupCallback(self, *args):
         '''
         Manage checkbox and radio buttons
@@ -1692,6 +1842,21 @@ class spPaint3dWin2025 (object):
             self.uiValues.group = 2.0
         elif(radiocol == 'uiSetupContinuousTransform'):
             self.uiValues.continuousTransform = getBoolFromMayaControl(args[1][0], self.mayaVersion)
+        elif(radiocol == 'uiSetupProxyCursor'):
+            self.uiValues.proxyCursor = getBoolFromMayaControl(args[1][0], self.mayaVersion)
+        elif(radiocol == 'uiSetupCursorPool'):
+            self.uiValues.cursorPoolDepth = max(0, int(args[1][0]))
+            if (self.uiValues.cursorPoolDepth):
+                self.errorHandle.raiseError("Cursor pool on: placed cursors taken from the pool are not removed by undo")
+            self.updateCtx() #filling or emptying the pool right away
+        elif(radiocol == 'uiSetupLocalRaycast'):
+            self.uiValues.localRaycast = getBoolFromMayaControl(args[1][0], self.mayaVersion)
+        elif(radiocol == 'uiSetupDeferredCreation'):
+            self.uiValues.deferredCreation = getBoolFromMayaControl(args[1][0], self.mayaVersion)
+        elif(radiocol == 'uiSetupRefreshRate'):
+            self.uiValues.refreshRate = max(0, int(args[1][0]))
+        elif(radiocol == 'uiSetupRandomSeed'):
+            self.uiValues.randomSeed = max(0, int(args[1][0]))
         else:
             print (args)
 